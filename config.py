@@ -108,6 +108,51 @@ def get_downloads_dir():
     return os.path.join(os.path.expanduser('~'), 'Downloads')
 
 
+# ===== CACHES =====
+# Everything here is disposable: deleting runtime/cache is always safe.
+CACHE_DIR = os.path.join(RUNTIME_DIR, 'cache')
+
+# Extraction results (info dicts) shared by all download workers
+META_CACHE_DIR = os.path.join(CACHE_DIR, 'meta')
+META_CACHE_TTL = 6 * 3600          # titles, format lists
+META_STREAM_TTL = 30 * 60          # stream URLs that carry no own expiry
+META_CACHE_MAX_ENTRIES = 500
+META_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Preview images, content-addressed (one blob per distinct image)
+THUMB_CACHE_DIR = os.path.join(CACHE_DIR, 'thumbs')
+THUMB_CACHE_TTL = 7 * 24 * 3600
+THUMB_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Decoded, rounded thumbnails kept in memory (approximate pixel bytes)
+THUMB_MEMORY_MAX_BYTES = 48 * 1024 * 1024
+
+# Flat video lists of probed channels/playlists (revalidated on every use)
+LIST_CACHE_DIR = os.path.join(CACHE_DIR, 'listings')
+LIST_CACHE_MAX_ENTRIES = 200
+
+# Running downloads per site (extractor, or host of unknown links) at most,
+# whatever the parallel limit: many simultaneous YouTube jobs invite bot checks
+SITE_MAX_CONCURRENT = {'youtube': 4}
+
+# Connections all running downloads may open together (core.connections),
+# and the fragments one DASH/HLS stream fetches at once at most
+CONNECTION_BUDGET = 16
+FRAGMENTS_PER_JOB = 8
+# Fragments in flight a site starts at before core.fragments has learned
+# better ('' = any other site)
+FRAGMENTS_START = {'youtube': 4, 'twitchvod': 6, 'vimeo': 6, '': 4}
+# Progressive files at least this big are fetched as byte ranges over
+# several connections (core.segmented) when the server allows it
+SEGMENTED_DOWNLOADS = True
+SEGMENTED_MIN_SIZE = 16 * 1024 * 1024
+SEGMENTS_PER_FILE = 4
+
+# Not caches: IDs downloaded per output folder (channel mirroring) and
+# the finished downloads behind duplicate detection
+ARCHIVE_DIR = os.path.join(RUNTIME_DIR, 'archives')
+HISTORY_DB = os.path.join(RUNTIME_DIR, 'history.sqlite3')
+
+
 # ===== URLS =====
 FFMPEG_DOWNLOAD_URL = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
 YTDLP_GITHUB_API = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
@@ -193,6 +238,8 @@ def set_theme(hue=None, saturation=None, dark=None):
     global COLOR_BTN_BG, COLOR_BTN_BG_HOVER, COLOR_BTN_BG_ACTIVE, COLOR_BTN_TEXT
     global COLOR_TEXT, COLOR_TEXT_MUTED, COLOR_ITEM_BG, COLOR_TRACK, COLOR_THUMB_BG
     global COLOR_GREEN, COLOR_RED
+    global COLOR_CHIP_RED_BG, COLOR_CHIP_RED_BG_HOVER, COLOR_CHIP_RED_TEXT
+    global COLOR_CHIP_GREEN_BG, COLOR_CHIP_GREEN_BG_HOVER, COLOR_CHIP_GREEN_TEXT
     global STYLESHEET_MAIN, STYLESHEET_GROUPBOX, STYLESHEET_PROGRESS_BAR
     global STYLESHEET_BUTTON_PRIMARY, STYLESHEET_BUTTON_YELLOW
     global STYLESHEET_BUTTON_RED, STYLESHEET_BUTTON_GREEN, STYLESHEET_BUTTON_DELETE
@@ -264,6 +311,12 @@ def set_theme(hue=None, saturation=None, dark=None):
         chip_green_bg, chip_green_bg_hover = _oklch(.95, .04, 150), _oklch(.91, .06, 150)
         chip_green_text = _oklch(.55, .13, 150)
 
+    # Chip colors, also painted directly by the download list delegate
+    COLOR_CHIP_RED_BG, COLOR_CHIP_RED_BG_HOVER = chip_red_bg, chip_red_bg_hover
+    COLOR_CHIP_RED_TEXT = chip_red_text
+    COLOR_CHIP_GREEN_BG, COLOR_CHIP_GREEN_BG_HOVER = chip_green_bg, chip_green_bg_hover
+    COLOR_CHIP_GREEN_TEXT = chip_green_text
+
     STYLESHEET_MAIN = f"""
         QMainWindow {{
             background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
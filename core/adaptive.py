@@ -0,0 +1,98 @@
+"""
+Adaptive download concurrency - how many downloads run at once in the
+"Adaptive" download mode.
+
+A fixed parallel limit leaves slots idle while jobs wait on extraction
+(page, player JS, challenge solving) and oversubscribes the line once jobs
+are bandwidth-bound. The controller samples aggregate bytes/s, per-job
+speed and how many running jobs have not received a byte yet, and moves
+the limit AIMD-style within the user's bounds:
+
+- additive increase (+1) while work is waiting and the slots are
+  latency-bound or the last increase still raised total throughput;
+- multiplicative decrease when a site rate-limits us (HTTP 429, bot
+  check), or when the last increase only split the same bandwidth into
+  more, slower transfers;
+- every few quiet windows one more slot is probed, so a faster line (or a
+  finished bandwidth hog) is noticed.
+"""
+
+
+class AdaptiveLimit:
+    """AIMD controller for the number of running downloads"""
+
+    WINDOW = 3              # samples per decision (the UI samples every 2 s)
+    GAIN = 1.05             # throughput must rise 5% to count as a gain
+    PER_JOB_DROP = 0.85     # per-job speed falling below 85%: saturated
+    BACKOFF = 0.7           # multiplicative decrease factor
+    PROBE_AFTER = 10        # quiet windows with work waiting before a probe
+
+    def __init__(self, low, high, start=None):
+        self.low = max(1, low)
+        self.high = max(self.low, high)
+        self.limit = min(self.high, max(self.low, start or self.low))
+        self._samples = []
+        self._prev = None          # (total B/s, per-job B/s) of the last window
+        self._increased = False    # the last decision raised the limit
+        self._congested = False
+        self._quiet = 0
+
+    def set_bounds(self, low, high):
+        self.low = max(1, low)
+        self.high = max(self.low, high)
+        self.limit = min(self.high, max(self.low, self.limit))
+
+    def congestion(self):
+        """A site pushed back (rate limit, bot check): back off next time"""
+        self._congested = True
+
+    def update(self, total_speed, transferring, waiting_first_byte, running, pending):
+        """Feed one sample. total_speed - aggregate bytes/s; transferring -
+        jobs moving bytes; waiting_first_byte - running jobs still
+        extracting; pending - queued jobs. Returns (limit, reason), reason
+        being None while the limit stays."""
+        self._samples.append((total_speed, transferring, waiting_first_byte,
+                              running, pending))
+        if len(self._samples) < self.WINDOW and not self._congested:
+            return self.limit, None
+        samples, self._samples = self._samples, []
+        n = len(samples)
+        total = sum(s[0] for s in samples) / n
+        moving = sum(s[1] for s in samples) / n
+        extracting = sum(s[2] for s in samples) / n
+        busy = min(s[3] for s in samples)
+        queued = min(s[4] for s in samples)
+        per_job = total / moving if moving else 0.0
+        prev, self._prev = self._prev, (total, per_job)
+        increased, self._increased = self._increased, False
+
+        old = self.limit
+        reason = None
+        if self._congested:
+            self._congested = False
+            self.limit = max(self.low, min(old - 1, int(old * self.BACKOFF)))
+            reason = 'rate limited'
+        elif (increased and prev is not None and prev[1] > 0 and per_job > 0
+                and total < prev[0] * self.GAIN
+                and per_job < prev[1] * self.PER_JOB_DROP):
+            self.limit = max(self.low, min(old - 1, int(old * self.BACKOFF)))
+            reason = 'bandwidth-bound'
+        elif queued and busy >= old:
+            if extracting * 2 >= busy:
+                reason = 'latency-bound'
+            elif prev is None or total >= prev[0] * self.GAIN:
+                reason = 'throughput rising'
+            else:
+                self._quiet += 1
+                if self._quiet >= self.PROBE_AFTER:
+                    reason = 'probing'
+            if reason is not None:
+                self.limit = min(self.high, old + 1)
+                self._increased = self.limit > old
+        if self.limit != old:
+            self._quiet = 0
+            return self.limit, reason
+        return self.limit, None
+
+
+__all__ = ['AdaptiveLimit']
@@ -0,0 +1,90 @@
+"""
+Download archive - the IDs already downloaded into an output folder.
+
+Kept per output folder and media type in runtime/archives, one line per
+video in yt-dlp's --download-archive format ("<extractor> <id>"), so the
+files can be handed to (or taken from) yt-dlp itself. The whole archive is
+held in a set: a mirror checks thousands of listed videos against it in
+microseconds and only the missing ones are ever extracted.
+"""
+import hashlib
+import os
+import threading
+
+import config
+
+
+class DownloadArchive:
+    """Set of (extractor, id) backed by an append-only file (thread-safe)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = set()   # (extractor lowercased, id)
+        self._ids = set()    # ids alone, for entries of unknown extractor
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    extractor, _, vid = line.strip().partition(' ')
+                    if vid:
+                        self._keys.add((extractor.lower(), vid))
+                        self._ids.add(vid)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, extractor, vid):
+        """Is the video archived? Without an extractor the id alone counts"""
+        if not vid:
+            return False
+        with self._lock:
+            if extractor:
+                return (extractor.lower(), vid) in self._keys
+            return vid in self._ids
+
+    def add(self, extractor, vid):
+        """Record a downloaded video (best-effort, no-op when known)"""
+        if not extractor or not vid:
+            return
+        key = (extractor.lower(), vid)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._ids.add(vid)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(f'{key[0]} {vid}\n')
+            except OSError:
+                pass
+
+
+def archive_path(folder, media_type):
+    """Archive file of an output folder (case and separators of the folder
+    path do not matter on Windows)"""
+    norm = os.path.normcase(os.path.abspath(folder))
+    name = hashlib.sha1(norm.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(config.ARCHIVE_DIR, f'{name}-{media_type.lower()}.txt')
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(folder, media_type):
+    """The process-wide archive of folder for media_type ('Video'/'Audio')"""
+    path = archive_path(folder, media_type)
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = DownloadArchive(path)
+        return archive
+
+
+__all__ = ['DownloadArchive', 'archive_path', 'get_archive']
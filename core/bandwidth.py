@@ -0,0 +1,144 @@
+"""
+Global bandwidth limit - one budget for every download of the process.
+
+The cap comes from a weekly schedule (e.g. 2 MB/s during office hours,
+unlimited overnight) and is split between the jobs moving bytes right now
+in proportion to their weights (priority). Each job draws from its own
+token bucket refilled at its share; shares are recomputed as jobs start,
+finish or go idle, so the whole budget is always in use.
+
+Module-backend transfers draw tokens from their progress hook (the hook
+runs on the transfer thread, so sleeping there throttles the transfer).
+yt-dlp.exe processes get their current share as --limit-rate at start.
+"""
+import threading
+import time
+
+_IDLE_AFTER = 2.0   # a job that drew nothing for this long gives its share back
+_BURST = 0.5        # seconds of share a bucket may hold
+
+
+class BandwidthSchedule:
+    """Weekly cap: rules of (weekdays, start hour, end hour, bytes/s) and
+    a default for the rest of the week (0 = unlimited). Weekdays as in
+    datetime: Monday is 0. The first matching rule wins."""
+
+    def __init__(self, rules=(), default=0):
+        self.rules = list(rules)
+        self.default = default
+
+    def rate_at(self, when=None):
+        t = time.localtime(when)
+        hour = t.tm_hour + t.tm_min / 60.0
+        for days, start, end, rate in self.rules:
+            if t.tm_wday not in days:
+                continue
+            if start <= end and start <= hour < end:
+                return rate
+            if start > end and (hour >= start or hour < end):  # over midnight
+                return rate
+        return self.default
+
+
+class _Bucket:
+    __slots__ = ('weight', 'tokens', 'stamp', 'last_draw')
+
+    def __init__(self, weight):
+        self.weight = weight
+        self.tokens = 0.0
+        self.stamp = time.monotonic()
+        self.last_draw = 0.0
+
+
+class BandwidthLimiter:
+    """Weighted token buckets under one schedule-driven cap (thread-safe)"""
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule or BandwidthSchedule()
+        self._lock = threading.Lock()
+        self._jobs = {}  # job -> _Bucket
+
+    def set_schedule(self, schedule):
+        with self._lock:
+            self.schedule = schedule
+
+    def rate(self):
+        """Current total cap in bytes/s; 0 = unlimited"""
+        return self.schedule.rate_at()
+
+    def register(self, job, weight=1.0):
+        with self._lock:
+            self._jobs[job] = _Bucket(max(0.1, weight))
+
+    def unregister(self, job):
+        with self._lock:
+            self._jobs.pop(job, None)
+
+    def _share(self, bucket, rate, now):
+        """bucket's part of rate among the jobs drawing now (caller holds
+        the lock)"""
+        active = sum(b.weight for b in self._jobs.values()
+                     if b is bucket or now - b.last_draw < _IDLE_AFTER)
+        return rate * bucket.weight / active
+
+    def share(self, job):
+        """Current share of job in bytes/s (0 = unlimited) - for backends
+        that cannot draw tokens (yt-dlp.exe: --limit-rate)"""
+        rate = self.rate()
+        if not rate:
+            return 0
+        with self._lock:
+            bucket = self._jobs.get(job)
+            if bucket is None:
+                return rate
+            # an exe job counts as drawing for as long as it runs
+            bucket.last_draw = float('inf')
+            return self._share(bucket, rate, time.monotonic())
+
+    def consume(self, job, nbytes, cancelled=None):
+        """Account nbytes transferred by job; sleeps while its bucket is
+        in debt. cancelled() is polled while sleeping."""
+        rate = self.rate()
+        if nbytes <= 0:
+            return
+        with self._lock:
+            bucket = self._jobs.get(job)
+            if bucket is None:
+                return
+            now = time.monotonic()
+            if not rate:
+                bucket.last_draw = now
+                bucket.tokens = 0.0
+                return
+            share = self._share(bucket, rate, now)
+            if now - bucket.last_draw >= _IDLE_AFTER:
+                bucket.tokens = 0.0  # no credit saved up while idle
+            else:
+                bucket.tokens = min(share * _BURST,
+                                    bucket.tokens + (now - bucket.stamp) * share)
+            bucket.stamp = now
+            bucket.last_draw = now
+            bucket.tokens -= nbytes
+            wait = -bucket.tokens / share if bucket.tokens < 0 else 0.0
+        while wait > 0:
+            if cancelled is not None and cancelled():
+                return
+            step = min(wait, 0.25)
+            time.sleep(step)
+            wait -= step
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """The process-wide bandwidth limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = BandwidthLimiter()
+        return _limiter
+
+
+__all__ = ['BandwidthLimiter', 'BandwidthSchedule', 'get_limiter']
@@ -0,0 +1,142 @@
+"""
+Global connection budget - how many sockets all downloads open together.
+
+yt-dlp's concurrent fragment downloads are per job, so they multiply with
+the number of parallel jobs: ten jobs with eight fragments each are 80
+connections to the same CDN, which answers by throttling all of them.
+Instead the app owns one budget (config.CONNECTION_BUDGET) and hands each
+running job a part of it: by priority weight, and never more than the job
+can use - a progressive (single-file) format uses one connection, a
+DASH/HLS one as many as it fetches fragments at once (core.fragments
+picks that level per site). What a job cannot use goes to
+the others (water-filling). Allotments are recomputed whenever a job
+starts, learns its format or finishes; jobs are told through
+set_connections(n). yt-dlp reads the fragment concurrency when a stream
+starts, so a new allotment applies from the job's next stream (e.g. the
+audio after the video); yt-dlp.exe gets its allotment as -N at start.
+"""
+import threading
+
+import config
+
+_FRAGMENTED_PROTOCOLS = ('m3u8', 'm3u8_native', 'http_dash_segments',
+                         'http_dash_segments_generator', 'dash', 'ism', 'f4m')
+
+
+def fragment_demand(info, level=None):
+    """Connections a video could use once its formats are chosen (info of
+    yt-dlp's 'before_dl' stage): 1 per progressive stream, level (default
+    config.FRAGMENTS_PER_JOB) for fragmented (DASH/HLS) ones"""
+    cap = min(level or config.FRAGMENTS_PER_JOB, config.FRAGMENTS_PER_JOB)
+    if not isinstance(info, dict):
+        return cap
+    demand = 1
+    for fmt in info.get('requested_formats') or [info]:
+        if not isinstance(fmt, dict):
+            continue
+        fragments = fmt.get('fragments')
+        protocols = str(fmt.get('protocol') or '').split('+')
+        if fragments or any(p in _FRAGMENTED_PROTOCOLS for p in protocols):
+            count = len(fragments) if isinstance(fragments, list) else cap
+            demand = max(demand, min(cap, count))
+    return demand
+
+
+class ConnectionBudget:
+    """Weighted water-filling of a fixed number of connections among the
+    registered jobs (thread-safe). Every job gets at least one."""
+
+    def __init__(self, total):
+        self.total = total
+        self._lock = threading.Lock()
+        self._jobs = {}    # job -> [weight, demand]
+        self._alloc = {}   # job -> connections
+
+    def register(self, job, weight=1.0, demand=None):
+        """Add a running job (demand: connections it could use, default
+        FRAGMENTS_PER_JOB); returns its allotment"""
+        with self._lock:
+            self._jobs[job] = [max(0.1, weight), demand or config.FRAGMENTS_PER_JOB]
+        self._rebalance()
+        return self.allotment(job)
+
+    def update_demand(self, job, demand):
+        """The job knows its format now; returns its new allotment"""
+        with self._lock:
+            if job not in self._jobs:
+                return 1
+            self._jobs[job][1] = max(1, demand)
+        self._rebalance()
+        return self.allotment(job)
+
+    def unregister(self, job):
+        with self._lock:
+            self._jobs.pop(job, None)
+            self._alloc.pop(job, None)
+        self._rebalance()
+
+    def allotment(self, job):
+        with self._lock:
+            return self._alloc.get(job, 1)
+
+    def set_total(self, total):
+        with self._lock:
+            self.total = max(1, total)
+        self._rebalance()
+
+    def _rebalance(self):
+        with self._lock:
+            alloc = self._fill()
+            changed = [(job, n) for job, n in alloc.items()
+                       if self._alloc.get(job) != n]
+            self._alloc = alloc
+        for job, n in changed:
+            try:
+                job.set_connections(n)
+            except Exception:
+                pass
+
+    def _fill(self):
+        """Allotments: jobs wanting less than their weighted share get what
+        they want, the rest is split again among the others (caller holds
+        the lock)"""
+        alloc = {}
+        left = dict(self._jobs)
+        budget = max(self.total, len(left))
+        while left:
+            weights = sum(w for w, _ in left.values())
+            satisfied = {job: d for job, (w, d) in left.items()
+                         if d <= budget * w / weights}
+            if not satisfied:
+                break
+            for job, demand in satisfied.items():
+                alloc[job] = demand
+                budget -= demand
+                del left[job]
+        if left:
+            weights = sum(w for w, _ in left.values())
+            shares = {job: budget * w / weights for job, (w, _) in left.items()}
+            for job, share in shares.items():
+                alloc[job] = max(1, int(share))
+            # whole connections left over go to the largest remainders
+            spare = budget - sum(alloc[job] for job in left)
+            for job in sorted(shares, key=lambda j: shares[j] - int(shares[j]),
+                              reverse=True)[:max(0, spare)]:
+                alloc[job] += 1
+        return alloc
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_connection_budget():
+    """The process-wide connection budget"""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = ConnectionBudget(config.CONNECTION_BUDGET)
+        return _budget
+
+
+__all__ = ['ConnectionBudget', 'fragment_demand', 'get_connection_budget']
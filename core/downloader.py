@@ -1,27 +1,45 @@
 """
 Download worker thread for video/audio downloads
 """
+import copy
+import json
 import os
 import re
 import sys
 import time
 import subprocess
+import tempfile
+import threading
 import traceback
+import urllib.parse
 from PyQt5.QtCore import QThread, pyqtSignal
 
 import config
 from config import get_js_runtimes, get_js_runtimes_cli
+from core.metacache import get_metadata_cache
+from core.singleflight import SingleFlight
+from core import listcache, media_id, thumbs
+from core.bandwidth import get_limiter
+from core.connections import fragment_demand, get_connection_budget
+from core.fragments import get_fragment_tuner
+from core.segmented import DownloadCanceled, RangesUnsupported, SegmentedDownload
 
 # Hide console windows of child processes (ffmpeg/yt-dlp) in windowed builds
 _CREATE_NO_WINDOW = 0x08000000 if sys.platform == 'win32' else 0
 
-# [download]  45.3% of ~  10.55MiB at    2.50MiB/s ETA 00:03
-_PROGRESS_RE = re.compile(
-    r'\[download\]\s+(?P<percent>[\d.]+)%'
-    r'(?:\s+of\s+~?\s*(?P<total>\S+))?'
-    r'(?:\s+at\s+(?P<speed>\S+))?'
-    r'(?:\s+ETA\s+(?P<eta>\S+))?'
-)
+# Prefix of the structured lines yt-dlp.exe prints via --print and
+# --progress-template (progress values are raw numbers, NA when unknown)
+_EXE_EVENT = '__DIV__ '
+_EXE_PROGRESS_TEMPLATE = (
+    f'download:{_EXE_EVENT}progress %(progress.downloaded_bytes)s '
+    '%(progress.total_bytes)s %(progress.total_bytes_estimate)s '
+    '%(progress.speed)s %(progress.eta)s '
+    '%(progress.fragment_index)s %(progress.fragment_count)s')
+_EXE_PP_TEMPLATE = (f'postprocess:{_EXE_EVENT}postprocess '
+                    '%(progress.status)s %(progress.postprocessor)s')
+
+# Minimum seconds between two progress updates sent to the UI
+_PROGRESS_INTERVAL = 0.25
 
 # YouTube uses a typographic apostrophe in "you're", so match the prefix only
 BOT_CHECK_MARKER = "Sign in to confirm you"
@@ -31,21 +49,113 @@ FALLBACK_MARKERS = (
     'Only images are available',
 )
 
+# Plain file links the exe backend may fetch itself (no conversion needed)
+_DIRECT_EXTS = ('mp4', 'webm', 'mkv', 'mov', 'm4v')
+
+# In-flight extractions, shared by every worker of the process
+_EXTRACTIONS = SingleFlight()
+
+
+def extract_info_shared(url, extract, cancelled=None):
+    """Raw info dict for url: from the metadata cache, else from ONE
+    extract(url) call shared by all callers asking for url at the same time.
+    Returns (info, reused); reused is True when this caller did not extract."""
+    def flight():
+        cache = get_metadata_cache()
+        info = cache.get(url)
+        if info is not None:
+            return info, True
+        info = extract(url)
+        cache.put(url, info)
+        return info, False
+
+    # keyed by the video, not the link: youtu.be/X and watch?v=X share a call
+    (info, cached), shared = _EXTRACTIONS.do(media_id.media_key(url), flight, cancelled)
+    if not _is_video(info):
+        # playlist-like results may carry a one-shot generator of entries:
+        # it cannot be copied or consumed twice, so a waiter extracts itself
+        return (extract(url), False) if shared else (info, cached)
+    # every caller, the extracting one included, gets a private copy: the
+    # flight's result is never handed out, so a job mutating its info
+    # cannot race another job still copying it
+    return copy.deepcopy(info), cached or shared
+
+
+def _is_video(info):
+    """A single-video extraction result (as opposed to a playlist / url
+    result, whose entries may be a generator)"""
+    return isinstance(info, dict) and info.get('_type', 'video') == 'video'
+
+
+def _number(text):
+    """Numeric field of a progress template line; None for NA"""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _splittable(info):
+    """Is this selected stream a progressive HTTP file worth fetching as
+    byte ranges (core.segmented)?"""
+    if not config.SEGMENTED_DOWNLOADS or info.get('is_live') or info.get('fragments'):
+        return False
+    url = info.get('url') or ''
+    protocol = info.get('protocol') or url.split(':', 1)[0]
+    if protocol not in ('http', 'https'):
+        return False
+    size = info.get('filesize') or info.get('filesize_approx')
+    return not size or size >= config.SEGMENTED_MIN_SIZE
+
+
+def _best_thumbnail_url(info):
+    """Preview URL of an extraction result: the smallest variant that still
+    fills the card's hover zoom (unprocessed results usually carry only the
+    'thumbnails' list)"""
+    return (thumbs.pick_thumbnail(info.get('thumbnails'), *thumbs.CARD_SIZE)
+            or info.get('thumbnail'))
+
+
+class _FormatsChosen:
+    """yt-dlp 'before_dl' hook: the formats are selected, so the job knows
+    how many connections it can use - tell the connection budget before
+    the fragment downloader reads concurrent_fragment_downloads. Not a
+    yt-dlp PostProcessor subclass: those report to postprocessor_hooks,
+    which would show up as a conversion."""
+
+    def __init__(self, worker):
+        self.worker = worker
+
+    def set_downloader(self, downloader):
+        pass
+
+    def add_progress_hook(self, hook):
+        pass
+
+    def run(self, info):
+        worker = self.worker
+        level = get_fragment_tuner().level(worker.site)
+        worker.set_connections(get_connection_budget().update_demand(
+            worker, fragment_demand(info, level)))
+        return [], info
+
 
 class DownloadWorker(QThread):
     """Worker thread for downloading videos/audio files"""
-    progress_signal = pyqtSignal(str, str, str, str)  # percent, speed, size, eta
+    # percent, downloaded bytes, total bytes, speed B/s, eta s (-1 = unknown)
+    progress_signal = pyqtSignal(float, float, float, float, float)
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     title_signal = pyqtSignal(str)
-    thumbnail_signal = pyqtSignal(bytes)  # raw preview image bytes
+    thumbnail_signal = pyqtSignal(str, bytes)  # preview URL, raw image bytes
     log_signal = pyqtSignal(str)
     duplicate_signal = pyqtSignal(str)
     conversion_signal = pyqtSignal(str)
 
     def __init__(self, url, use_cookies, browser, media_type, resolution,
                  video_format, audio_format, output_dir,
-                 overwrite=False, filename_suffix="", cookies_file=""):
+                 overwrite=False, filename_suffix="", cookies_file="", info=None,
+                 bandwidth_weight=1.0):
         super().__init__()
         self.url = url
         self.use_cookies = use_cookies
@@ -57,22 +167,57 @@ class DownloadWorker(QThread):
         self.output_dir = output_dir
         self.overwrite = overwrite
         self.cookies_file = cookies_file  # path to a cookies.txt, or ""
+        # share of the global bandwidth cap and connection budget relative
+        # to other jobs (priority)
+        self.bandwidth_weight = bandwidth_weight
+        self.connections = 1  # fragments fetched at once (core.connections)
+        self.site = media_id.site(url)  # fragment level is learned per site
+        # fragmented stream being timed for core.fragments: [start time,
+        # first fragment, its bytes, last time, last fragment, its bytes,
+        # fragment count, fragments in flight]
+        self._frag_stream = None
+        self._ydl_params = None  # live YoutubeDL params (module backend)
+        self._bw_last = (None, 0)  # (file, bytes) last charged to the limiter
+        self._bw_lock = threading.Lock()
         # " (2)" etc. appended before the extension when saving a copy
         self.filename_suffix = str(filename_suffix).replace('%', '')
         self._is_running = True
+        self.preempted = False  # stopped to make room; the job is queued again
         self.title = ""
         self.paused = False
         self.filename = ""
         self._file_found = False
-        self._progress_counter = 0
+        self._last_progress = 0.0
+        # Latest raw transfer numbers (read by the scheduler)
+        self.downloaded_bytes = 0
+        self.total_bytes = 0
+        self.speed = 0.0
         self._proc = None  # active yt-dlp.exe subprocess (for cancel)
         self._backend = None  # 'module' or 'exe'
-        self._thumb_sent = False
+        # preview fetch state: None / 'pending' / 'done' (see _emit_thumbnail)
+        self._thumb_lock = threading.Lock()
+        self._thumb_state = None
+        self._thumb_tried = set()
+        self._thumb_next = []  # fallback URLs, in the order offered
+        # raw extraction result, reused across attempts; may be handed in
+        # by a speculative prefetch (MetadataPrefetchWorker)
+        self._info = info if isinstance(info, dict) else None
+        # _info / _info_file was not extracted by this job (cache/prefetch)
+        self._info_cached = self._info is not None
+        self._announced = False  # title/thumbnail sent to the UI
+        # (extractor key, video id) once known - the download archive entry
+        self.media_key = None
+        self._info_file = None  # cached info handed to yt-dlp.exe
 
     # ------------------------------------------------------------------ run
 
     def run(self):
         """Main download process"""
+        # preview URL known up front: fetch it while the page is extracted
+        self._emit_thumbnail(thumbs.predict_thumbnail(self.url))
+        get_limiter().register(self, self.bandwidth_weight)
+        self.connections = get_connection_budget().register(
+            self, self.bandwidth_weight, get_fragment_tuner().level(self.site))
         try:
             ydl_opts = {
                 'outtmpl': os.path.join(
@@ -82,6 +227,7 @@ class DownloadWorker(QThread):
                 'noplaylist': True,
                 'retries': 10,
                 'fragment_retries': 10,
+                'concurrent_fragment_downloads': self.connections,
                 'socket_timeout': 30,
                 'quiet': False,
                 'no_warnings': False,
@@ -122,10 +268,8 @@ class DownloadWorker(QThread):
                     return
                 if d.get('status') == 'started':
                     self.conversion_signal.emit('started')
-                    self.progress_signal.emit("100", "0 B/s", "Converting...", "0:00")
                 elif d.get('status') == 'finished':
                     self.conversion_signal.emit('finished')
-                    self.progress_signal.emit("100", "0 B/s", "Ready", "0:00")
                     filename = d.get('filename') or d.get('info_dict', {}).get('filepath', '')
                     if filename:
                         self.filename = filename
@@ -145,9 +289,17 @@ class DownloadWorker(QThread):
                 )
 
         except Exception as e:
+            if not self._is_running:
+                return  # stopped or preempted (e.g. while waiting on a shared extraction)
             self.error_signal.emit(str(e))
             self.log_signal.emit(f"Error downloading {self.media_type}: {str(e)}")
             self.log_signal.emit(f"Traceback:\n{traceback.format_exc()}")
+        finally:
+            self._drop_info_file()
+            self._end_fragment_stream()
+            self._ydl_params = None
+            get_limiter().unregister(self)
+            get_connection_budget().unregister(self)
 
     def _pick_backend(self):
         """Module gives real-time progress; a newer local exe wins over an
@@ -198,54 +350,26 @@ class DownloadWorker(QThread):
     # ------------------------------------------------------------ exe path
 
     def _download_with_exe(self, ydl_opts, retry_count=0, max_retries=3):
-        """Download using external yt-dlp.exe, streaming progress output"""
+        """Download using external yt-dlp.exe: ONE process per attempt that
+        reports title, thumbnail and final path as structured events along
+        with its progress output (no separate title probe process)"""
         if retry_count == 0:
+            if self._download_direct():
+                return
             self.log_signal.emit(f'[*] Using local yt-dlp exe: {config.YTDLP_EXE}')
-            self._fetch_title_with_exe()
+            if self._info is None:
+                # same link being extracted by another job: share its result
+                _EXTRACTIONS.wait(media_id.media_key(self.url),
+                                  cancelled=lambda: not self._is_running)
+            if self._info_file is None:
+                self._write_cached_info_file()
 
         cmd = self._build_cmd(config.YTDLP_EXE, ydl_opts)
         start_time = time.time()
-        output_lines = []
-
         try:
-            self._proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                creationflags=_CREATE_NO_WINDOW,
-            )
-            for line in self._proc.stdout:
-                if not self._is_running:
-                    try:
-                        self._proc.terminate()
-                    except OSError:
-                        pass
-                    break
-                line = line.rstrip()
-                if not line:
-                    continue
-                m = _PROGRESS_RE.search(line)
-                if m:
-                    self.progress_signal.emit(
-                        m.group('percent') or '0',
-                        m.group('speed') or '?',
-                        m.group('total') or '?',
-                        m.group('eta') or '?',
-                    )
-                else:
-                    output_lines.append(line)
-                    if not line.startswith('[debug]'):
-                        self.log_signal.emit(line)
-            try:
-                returncode = self._proc.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                self._proc.kill()
-                returncode = self._proc.wait()
+            returncode, output_lines = self._run_exe(cmd)
         finally:
-            self._proc = None
+            self._drop_info_file()
 
         # Cancelled by the user: not an error
         if not self._is_running:
@@ -259,6 +383,15 @@ class DownloadWorker(QThread):
             self.finished_signal.emit(self.filename)
             return
 
+        # Cached stream URLs rejected (e.g. expired early): extract afresh
+        if self._info_cached:
+            self.log_signal.emit('Cached metadata failed; extracting again')
+            get_metadata_cache().invalidate(self.url)
+            self._info = None
+            self._info_cached = False
+            self._download_with_exe(ydl_opts, retry_count, max_retries)
+            return
+
         # Bot verification: wait and retry
         if BOT_CHECK_MARKER in out:
             if retry_count < max_retries:
@@ -279,39 +412,152 @@ class DownloadWorker(QThread):
         else:
             raise RuntimeError(f'yt-dlp exited with code {returncode}. See Logs tab for details.')
 
-    def _fetch_title_with_exe(self):
-        """Fetch video title and thumbnail via yt-dlp.exe (best-effort)"""
+    def _run_exe(self, cmd):
+        """Run yt-dlp.exe, routing event/progress lines to the UI.
+        Returns (returncode, other output lines)."""
+        output_lines = []
         try:
-            cmd = [config.YTDLP_EXE, '--js-runtimes', get_js_runtimes_cli(),
-                   '--no-playlist', '--print', 'title', '--print', 'thumbnail',
-                   self.url]
-            p = subprocess.run(cmd, capture_output=True, text=True, timeout=30,
-                               encoding='utf-8', errors='replace',
-                               creationflags=_CREATE_NO_WINDOW)
-            lines = (p.stdout or '').strip().splitlines()
-            if lines:
-                self.title = lines[0]
-                self.title_signal.emit(self.title)
-            if len(lines) > 1 and lines[1].startswith('http'):
-                self._emit_thumbnail(lines[1])
-        except subprocess.TimeoutExpired:
-            self.log_signal.emit("Timeout fetching video title")
-        except (OSError, ValueError) as e:
-            self.log_signal.emit(f"Failed to get title: {type(e).__name__}")
+            self._proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                creationflags=_CREATE_NO_WINDOW,
+            )
+            for line in self._proc.stdout:
+                if not self._is_running:
+                    try:
+                        self._proc.terminate()
+                    except OSError:
+                        pass
+                    break
+                line = line.rstrip()
+                if not line:
+                    continue
+                if line.startswith(_EXE_EVENT):
+                    self._handle_exe_event(line[len(_EXE_EVENT):])
+                    continue
+                output_lines.append(line)
+                if not line.startswith('[debug]'):
+                    self.log_signal.emit(line)
+            try:
+                returncode = self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                returncode = self._proc.wait()
+        finally:
+            self._proc = None
+        return returncode, output_lines
 
-    def _emit_thumbnail(self, url):
-        """Download the preview image and hand it to the UI (best-effort)"""
-        if not url or self._thumb_sent:
+    def _announce_info(self):
+        """Send title and thumbnail of self._info to the UI (once)"""
+        if self._announced:
+            return
+        self._announced = True
+        if self._info.get('extractor_key') and self._info.get('id'):
+            self.media_key = (self._info['extractor_key'], str(self._info['id']))
+        self.title = self._info.get('title') or 'No title'
+        if self._info.get('title'):
+            self.title_signal.emit(self.title)
+        self._emit_thumbnail(_best_thumbnail_url(self._info))
+
+    def _handle_exe_event(self, payload):
+        """'<name> <json value>' printed by the --print templates of _build_cmd"""
+        name, _, raw = payload.partition(' ')
+        if name == 'progress':
+            fields = [_number(x) for x in raw.split(' ')]
+            if len(fields) == 7:
+                downloaded, total, estimate, speed, eta, frag, frags = fields
+                self._report_progress(downloaded, total or estimate, speed, eta,
+                                      frag, frags)
+            return
+        if name == 'postprocess':
+            status = raw.split(' ', 1)[0]
+            if status == 'started':
+                self.conversion_signal.emit('started')
+            elif status == 'finished':
+                self.conversion_signal.emit('finished')
             return
-        self._thumb_sent = True
         try:
-            from tools.net import urlopen
-            with urlopen(url, timeout=15) as resp:
-                data = resp.read(3 * 1024 * 1024)
-            if data:
-                self.thumbnail_signal.emit(bytes(data))
-        except Exception:
-            pass
+            value = json.loads(raw)
+        except ValueError:
+            value = None  # yt-dlp prints NA for missing fields
+        if name == 'title' and isinstance(value, str) and value:
+            self.title = value
+            self.title_signal.emit(value)
+        elif name == 'thumbnails' and isinstance(value, list):
+            self._emit_thumbnail(thumbs.pick_thumbnail(value, *thumbs.CARD_SIZE))
+        elif name == 'thumbnail' and isinstance(value, str):
+            self._emit_thumbnail(value)  # fallback if the variant fails
+        elif name == 'key' and isinstance(value, list) and len(value) == 2 and all(value):
+            self.media_key = (str(value[0]), str(value[1]))
+        elif name == 'filepath' and isinstance(value, str) and value:
+            self.filename = value
+            self._file_found = True
+        elif name == 'info' and isinstance(value, dict):
+            get_metadata_cache().put(self.url, value)
+
+    def _write_cached_info_file(self):
+        """Hand a still-valid cached info dict to yt-dlp.exe (--load-info-json)
+        so the exe skips extraction entirely"""
+        info = self._info or get_metadata_cache().get(self.url)
+        if info is None:
+            return
+        # a temp file, not the cache directory: the cache's eviction would
+        # count it and could delete it while the exe reads it
+        try:
+            fd, path = tempfile.mkstemp(prefix='job-', suffix='.info.json')
+        except OSError:
+            return
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return
+        self._info_file = path
+        self._info_cached = True
+        self.log_signal.emit('[*] Using cached metadata (no extraction needed)')
+
+    def _drop_info_file(self):
+        if self._info_file:
+            try:
+                os.remove(self._info_file)
+            except OSError:
+                pass
+            self._info_file = None
+
+    def _emit_thumbnail(self, url):
+        """Fetch the preview image on the shared pool and hand it to the UI
+        (best-effort, never blocks the download). Only one fetch runs at a
+        time; URLs offered meanwhile are kept as fallbacks for it."""
+        with self._thumb_lock:
+            if (not url or self._thumb_state == 'done'
+                    or url in self._thumb_tried):
+                return
+            if self._thumb_state == 'pending':
+                if url not in self._thumb_next:
+                    self._thumb_next.append(url)
+                return
+            self._thumb_state = 'pending'
+            self._thumb_tried.add(url)
+        thumbs.fetch_async(url, lambda data: self._on_thumbnail_data(url, data))
+
+    def _on_thumbnail_data(self, url, data):
+        """Fetch result (runs on a pool thread)"""
+        with self._thumb_lock:
+            self._thumb_state = 'done' if data else None
+            fallbacks, self._thumb_next = self._thumb_next, []
+        if data:
+            self.thumbnail_signal.emit(url, data)
+            return
+        for fallback in fallbacks:
+            self._emit_thumbnail(fallback)  # first starts, the rest queue again
 
     def _build_cmd(self, exe, ydl_opts):
         """Build command line for external yt-dlp.exe"""
@@ -319,11 +565,21 @@ class DownloadWorker(QThread):
             exe,
             '--js-runtimes', get_js_runtimes_cli(),
             '--no-playlist',
-            '--newline',  # one progress update per line (parsed for the UI)
+            '--newline',  # one progress event per line (see _handle_exe_event)
             '--socket-timeout', '30',
             '--retries', '10',
             '--fragment-retries', '10',
             '-o', ydl_opts['outtmpl'],
+            # Structured events instead of a separate title probe process.
+            # --print implies --quiet/--simulate, so switch both back off.
+            '--no-quiet', '--no-simulate',
+            '--print', f'video:{_EXE_EVENT}title %(title)j',
+            '--print', f'video:{_EXE_EVENT}thumbnails %(thumbnails)j',
+            '--print', f'video:{_EXE_EVENT}thumbnail %(thumbnail)j',
+            '--print', f'video:{_EXE_EVENT}key [%(extractor_key)j,%(id)j]',
+            '--print', f'after_move:{_EXE_EVENT}filepath %(filepath)j',
+            '--progress-template', _EXE_PROGRESS_TEMPLATE,
+            '--progress-template', _EXE_PP_TEMPLATE,
         ]
 
         if os.path.isdir(config.LOCAL_FFMPEG_BIN):
@@ -332,6 +588,13 @@ class DownloadWorker(QThread):
         if self.overwrite:
             cmd.append('--force-overwrites')
 
+        # the exe cannot draw from the limiter: it gets its share up front
+        rate = get_limiter().share(self)
+        if rate:
+            cmd.extend(['--limit-rate', str(max(1024, int(rate)))])
+        # ...and its part of the connection budget
+        cmd.extend(['-N', str(self.connections)])
+
         if ydl_opts.get('format'):
             cmd.extend(['-f', ydl_opts['format']])
 
@@ -348,7 +611,12 @@ class DownloadWorker(QThread):
             cmd.extend(['--recode-video', str(self.video_format)])
             cmd.extend(['--ppa', 'VideoConvertor:' + ' '.join(self._convert_args())])
 
-        cmd.append(str(self.url))
+        if self._info_file:
+            cmd.extend(['--load-info-json', self._info_file])
+        else:
+            # full info dict, stored in the shared metadata cache
+            cmd.extend(['--print', f'video:{_EXE_EVENT}info %()j'])
+            cmd.append(str(self.url))
         return [str(x) for x in cmd if x]
 
     def _retry_with_fallback(self, cmd, start_time):
@@ -367,20 +635,15 @@ class DownloadWorker(QThread):
         cmd2.insert(len(cmd2) - 1, '-f')
         cmd2.insert(len(cmd2) - 1, 'best')
 
-        try:
-            proc2 = subprocess.run(cmd2, check=True, capture_output=True, text=True,
-                                   encoding='utf-8', errors='replace',
-                                   creationflags=_CREATE_NO_WINDOW)
-            self.log_signal.emit(proc2.stdout or proc2.stderr or '')
+        returncode, _ = self._run_exe(cmd2)
+        if not self._is_running:
+            return
+        if returncode == 0:
             self._find_downloaded_file(start_time)
             self.finished_signal.emit(self.filename)
-        except subprocess.CalledProcessError as e2:
-            self.log_signal.emit((e2.stdout or '') + (e2.stderr or ''))
-            try:
-                self.list_formats()
-            except Exception:
-                pass
-            raise
+            return
+        self._try_list_formats()
+        raise RuntimeError(f'yt-dlp exited with code {returncode}. See Logs tab for details.')
 
     # --------------------------------------------------------- module path
 
@@ -442,24 +705,150 @@ class DownloadWorker(QThread):
                 self.error_signal.emit(err)
 
     def _run_module_download(self, ydl_opts):
-        """Single download attempt via the yt_dlp module"""
+        """Single download attempt via the yt_dlp module.
+
+        The page is extracted ONCE (process=False: webpage, player JS and
+        the Deno challenge run a single time) and that very result is handed
+        to format selection + download. The raw result is kept on the worker,
+        so the format fallback retry does not extract again either, and a
+        still-valid entry of the shared metadata cache replaces the
+        extraction altogether."""
         yt_dlp = config.get_yt_dlp()
+        cache = get_metadata_cache()
         start_time = time.time()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(self.url, download=False)
-            if isinstance(info, dict):
-                self.title = info.get('title', 'No title')
-                self.title_signal.emit(self.title)
-                self._emit_thumbnail(info.get('thumbnail'))
+            self._ydl_params = ydl.params
+            ydl.add_post_processor(_FormatsChosen(self), when='before_dl')
+            self._split_progressive(ydl, yt_dlp)
+            if self._info is None:
+                self._info, self._info_cached = extract_info_shared(
+                    self.url,
+                    lambda u: ydl.extract_info(u, download=False, process=False),
+                    cancelled=lambda: not self._is_running)
+            if not isinstance(self._info, dict):
+                raise RuntimeError('Invalid response from yt-dlp')
+            if self._info_cached and not self._announced:
+                self.log_signal.emit('[*] Reusing metadata extracted earlier (no extraction needed)')
+            self._announce_info()
+            info = self._info
+            if _is_video(info):
+                # process_ie_result mutates the dict and its formats in
+                # place; keep the original reusable
+                info = copy.deepcopy(info)
             else:
-                self.title = 'No title'
-            ydl.download([self.url])
-            if not self._file_found:
-                self._find_downloaded_file(start_time)
-            self.finished_signal.emit(self.filename)
+                # entries may be a one-shot generator: a retry extracts again
+                self._info = None
+            extract_again = False
+            try:
+                ydl.process_ie_result(info, download=True)
+            except Exception:
+                if not (self._info_cached and self._is_running):
+                    raise
+                # Cached stream URLs rejected (e.g. expired early): extract afresh
+                self.log_signal.emit('Cached metadata failed; extracting again')
+                cache.invalidate(self.url)
+                self._info = None
+                self._info_cached = False
+                extract_again = True
+        if extract_again:
+            return self._run_module_download(ydl_opts)
+        if not self._file_found:
+            self._find_downloaded_file(start_time)
+        self.finished_signal.emit(self.filename)
 
     # ------------------------------------------------------------- helpers
 
+    def _split_progressive(self, ydl, yt_dlp):
+        """Route large progressive streams of ydl through the segmented
+        transfer; other streams, and servers refusing ranges, keep
+        yt-dlp's own downloaders"""
+        plain_dl = ydl.dl
+
+        def opener(url, headers):
+            # yt-dlp's networking: cookies, proxy and impersonation apply
+            return ydl.urlopen(yt_dlp.networking.Request(url, headers=headers))
+
+        def dl(name, info, subtitle=False, test=False):
+            if not (subtitle or test) and _splittable(info):
+                chunk = (info.get('downloader_options') or {}).get('http_chunk_size')
+                if self._segmented_transfer(info['url'], name, info.get('http_headers'),
+                                            opener, chunk):
+                    return True, True
+            return plain_dl(name, info, subtitle=subtitle, test=test)
+
+        ydl.dl = dl
+
+    def _segmented_transfer(self, url, path, headers=None, opener=None, chunk_size=None):
+        """Fetch url into path as concurrent byte ranges (core.segmented);
+        False when the server does not serve ranges, the file is too small
+        to gain or the connection budget has no second connection"""
+        part = path + '.part'
+        download = SegmentedDownload(
+            url, part, headers, opener=opener, chunk_size=chunk_size,
+            throttle=lambda n: get_limiter().consume(
+                self, n, cancelled=lambda: not self._is_running),
+            cancelled=lambda: not self._is_running, paused=lambda: self.paused)
+        total = download.probe()
+        if not total or total < config.SEGMENTED_MIN_SIZE:
+            download.discard()  # yt-dlp must not resume a preallocated .part
+            return False
+        self.set_connections(get_connection_budget().update_demand(
+            self, config.SEGMENTS_PER_FILE))
+        resuming = download.has_state()
+        if self.connections < 2 and not resuming:
+            return False
+        download.segments = self.connections
+        self.log_signal.emit(
+            f'[*] {"Resuming" if resuming else "Fetching"} {total / 1048576:.1f} MB '
+            f'over {self.connections} connections')
+        try:
+            download.run(lambda done, size, speed: self._report_progress(
+                done, size, speed, (size - done) / speed if speed > 0 else -1))
+        except DownloadCanceled:
+            # canceled or preempted: .part and its open ranges stay for a resume
+            raise Exception("Download canceled")
+        except RangesUnsupported:
+            download.discard()
+            self.log_signal.emit('[*] Server stopped serving ranges; downloading normally')
+            return False
+        except Exception:
+            download.discard()
+            raise
+        os.replace(part, path)
+        self._report_progress(total, total, 0, 0, force=True)
+        return True
+
+    def _download_direct(self):
+        """yt-dlp.exe's own downloader cannot be swapped out, so a plain
+        file link that needs no conversion is fetched here in byte ranges
+        instead; False hands the job to the exe as usual"""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.url).path)
+        stem, ext = os.path.splitext(os.path.basename(path))
+        ext = ext.lower().lstrip('.')
+        if (not config.SEGMENTED_DOWNLOADS or self.media_type != 'Video'
+                or ext not in _DIRECT_EXTS or not stem
+                or (self.video_format and ext != str(self.video_format).lower())):
+            return False
+        stem = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', stem)
+        target = os.path.join(self.output_dir, f'{stem}{self.filename_suffix}.{ext}')
+        if os.path.exists(target) and not self.overwrite:
+            return False
+        self.title = stem
+        self.title_signal.emit(stem)
+        try:
+            if not self._segmented_transfer(self.url, target):
+                return False
+        except Exception as e:
+            if not self._is_running:
+                self.log_signal.emit("Download canceled by user")
+                return True
+            self.log_signal.emit(f'[*] Segmented transfer failed ({e}); using yt-dlp.exe')
+            return False
+        self.filename = target
+        self._file_found = True
+        self.finished_signal.emit(target)
+        return True
+
     def _log_bot_check_help(self):
         self.log_signal.emit("")
         self.log_signal.emit("YouTube bot verification - max retries reached!")
@@ -546,41 +935,96 @@ class DownloadWorker(QThread):
                 raise Exception("Download canceled")
 
         if d.get('status') == 'downloading':
-            self._progress_counter += 1
-            if self._progress_counter % 5 != 0:  # throttle UI updates
-                return
-
-            downloaded = d.get('downloaded_bytes')
-            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            self._charge_bandwidth(d.get('filename'), d.get('downloaded_bytes'))
+            self._report_progress(
+                d.get('downloaded_bytes'),
+                d.get('total_bytes') or d.get('total_bytes_estimate'),
+                d.get('speed'), d.get('eta'),
+                d.get('fragment_index'), d.get('fragment_count'))
+        elif d.get('status') == 'finished':
+            total = d.get('total_bytes') or d.get('downloaded_bytes')
+            self._report_progress(total, total, 0, 0, force=True)
 
-            if isinstance(downloaded, (int, float)) and isinstance(total, (int, float)) and total > 0:
-                percent = str(int(100 * downloaded / total))
-                size = f"{downloaded / 1024 / 1024:.1f}MB/{total / 1024 / 1024:.1f}MB"
-            else:
-                percent_str = str(d.get('_percent_str', '0%')).strip()
-                percent = ''.join(c for c in percent_str if c.isdigit() or c == '.').rstrip('.') or '0'
-                size = str(d.get('_total_bytes_str', '?'))
-
-            speed = d.get('_speed_str', '')
-            if not speed:
-                raw_speed = d.get('speed')
-                if isinstance(raw_speed, (int, float)):
-                    speed = (f"{raw_speed / 1024 / 1024:.1f} MB/s" if raw_speed > 1024 * 1024
-                             else f"{raw_speed / 1024:.1f} KB/s")
-                else:
-                    speed = '?'
+    def _charge_bandwidth(self, filename, downloaded):
+        """Draw the bytes moved since the last hook call from the global
+        limiter; sleeping here (on the transfer thread) throttles the job"""
+        if not isinstance(downloaded, (int, float)):
+            return
+        # fragment threads report concurrently (and not always in order):
+        # charge each byte once, never the same range twice
+        with self._bw_lock:
+            last_file, last_bytes = self._bw_last
+            delta = downloaded - last_bytes if filename == last_file else downloaded
+            if delta > 0 or filename != last_file:
+                self._bw_last = (filename, downloaded)
+        if delta > 0:
+            get_limiter().consume(self, delta, cancelled=lambda: not self._is_running)
+
+    def _report_progress(self, downloaded, total, speed, eta,
+                         frag_index=None, frag_count=None, force=False):
+        """Record raw transfer numbers and emit a (throttled) UI update"""
+        downloaded = downloaded if isinstance(downloaded, (int, float)) else -1
+        total = total if isinstance(total, (int, float)) and total > 0 else -1
+        speed = speed if isinstance(speed, (int, float)) else -1
+        eta = eta if isinstance(eta, (int, float)) else -1
+        if downloaded >= 0:
+            self.downloaded_bytes = downloaded
+        if total > 0:
+            self.total_bytes = total
+        self.speed = max(speed, 0.0)
+        self._time_fragments(frag_index, frag_count, downloaded)
+
+        now = time.monotonic()
+        if not force and now - self._last_progress < _PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
 
-            eta = str(d.get('_eta_str') or d.get('eta') or '?')
+        if total > 0 and downloaded >= 0:
+            percent = min(100.0, 100.0 * downloaded / total)
+        elif isinstance(frag_index, (int, float)) and isinstance(frag_count, (int, float)) \
+                and frag_count > 0:
+            percent = min(100.0, 100.0 * frag_index / frag_count)
+        else:
+            percent = -1.0
+        self.progress_signal.emit(float(percent), float(downloaded), float(total),
+                                  float(speed), float(eta))
+
+    def _time_fragments(self, frag_index, frag_count, downloaded):
+        """Follow the current fragmented stream; a new stream (or the end,
+        frag_index None) hands the finished one to the fragment tuner"""
+        if not (isinstance(frag_index, (int, float)) and isinstance(frag_count, (int, float))
+                and frag_count > 0 and downloaded >= 0):
+            self._end_fragment_stream()
+            return
+        now = time.monotonic()
+        stream = self._frag_stream
+        if stream is None or frag_count != stream[6] or frag_index < stream[4]:
+            self._end_fragment_stream()
+            self._frag_stream = [now, frag_index, downloaded, now, frag_index,
+                                 downloaded, frag_count, self.connections]
+        else:
+            stream[3:6] = [now, frag_index, downloaded]
 
-            try:
-                self.progress_signal.emit(str(percent), str(speed), str(size), str(eta))
-            except Exception as e:
-                self.log_signal.emit(f"Progress emit error: {e}")
-        elif d.get('status') == 'finished':
-            self.progress_signal.emit("100", "0 B/s", "Processing...", "0:00")
+    def _end_fragment_stream(self):
+        stream, self._frag_stream = self._frag_stream, None
+        if stream is None:
+            return
+        start, first, first_bytes, last, index, nbytes, _, level = stream
+        new = get_fragment_tuner().observe(self.site, level, index - first,
+                                           nbytes - first_bytes, last - start)
+        if new is not None:
+            self.log_signal.emit(f'[*] {self.site or "site"}: {new} fragments at once from now on')
 
     # ------------------------------------------------------------ controls
 
+    def set_connections(self, n):
+        """New part of the connection budget (called by core.connections,
+        from any thread); yt-dlp picks it up with the next stream"""
+        self.connections = n
+        params = self._ydl_params
+        if params is not None:
+            params['concurrent_fragment_downloads'] = n
+
     def pause(self):
         """Pause/resume download (module backend only)"""
         if self._backend == 'exe':
@@ -600,7 +1044,14 @@ class DownloadWorker(QThread):
                 proc.terminate()
             except OSError:
                 pass
-        self.log_signal.emit("Download canceled by user")
+        if not self.preempted:
+            self.log_signal.emit("Download canceled by user")
+
+    def preempt(self):
+        """Stop for a more urgent job; the scheduler queues this job again,
+        so the worker ends quietly (no error, no result)"""
+        self.preempted = True
+        self.stop()
 
     # ------------------------------------------------------------- formats
 
@@ -628,6 +1079,12 @@ class DownloadWorker(QThread):
         self.log_signal.emit(f"Listing available formats for: {self.url}")
         browser_name = (self.browser or '').lower()
 
+        cached = get_metadata_cache().get(self.url, streams=False)
+        if cached and cached.get('formats'):
+            self.log_signal.emit('(from the metadata cache)')
+            self._log_formats(cached['formats'])
+            return
+
         if config.YTDLP_EXE and os.path.exists(config.YTDLP_EXE):
             try:
                 cmd = [config.YTDLP_EXE, '--js-runtimes', get_js_runtimes_cli(),
@@ -660,33 +1117,228 @@ class DownloadWorker(QThread):
                     if not formats:
                         self.log_signal.emit('No formats found via yt_dlp module.')
                         return
-                    for f in formats:
-                        if not isinstance(f, dict):
-                            continue
-                        self.log_signal.emit(
-                            f"{f.get('format_id')} - {f.get('ext')} - {f.get('height', '')}p - "
-                            f"{f.get('acodec', '')}/{f.get('vcodec', '')} - {f.get('tbr', '')}kbps"
-                        )
+                    self._log_formats(formats)
                     return
             except Exception as e:
                 self.log_signal.emit(f"yt_dlp list error: {e}")
 
         self.log_signal.emit('Unable to list formats: both exe and module unavailable.')
 
+    def _log_formats(self, formats):
+        for f in formats:
+            if not isinstance(f, dict):
+                continue
+            self.log_signal.emit(
+                f"{f.get('format_id')} - {f.get('ext')} - {f.get('height', '')}p - "
+                f"{f.get('acodec', '')}/{f.get('vcodec', '')} - {f.get('tbr', '')}kbps"
+            )
+
+
+class MetadataPrefetchWorker(QThread):
+    """Speculative extraction of a link as soon as it is pasted, so the
+    download job can start from a ready info dict"""
+    done = pyqtSignal(str, dict)   # url, raw info dict
+    failed = pyqtSignal(str)       # url
+
+    def __init__(self, url, use_cookies=False, browser="", cookies_file=""):
+        super().__init__()
+        self.url = url
+        self.use_cookies = use_cookies
+        self.browser = browser
+        self.cookies_file = cookies_file
+
+    def run(self):
+        try:
+            yt_dlp = config.get_yt_dlp()
+            if yt_dlp is None:
+                raise RuntimeError('yt-dlp Python module is not available')
+            opts = {
+                'noplaylist': True,
+                'skip_download': True,
+                'quiet': True,
+                'no_warnings': True,
+                'socket_timeout': 30,
+                'js_runtimes': get_js_runtimes(),
+            }
+            if self.cookies_file and os.path.exists(self.cookies_file):
+                opts['cookiefile'] = self.cookies_file
+            elif self.use_cookies and self.browser and self.browser != 'disabled':
+                opts['cookiesfrombrowser'] = (self.browser,)
+
+            def extract(url):
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    return ydl.extract_info(url, download=False, process=False)
+
+            info, _ = extract_info_shared(self.url, extract)
+            if not isinstance(info, dict) or info.get('_type', 'video') != 'video':
+                raise RuntimeError('not a single video')
+            self.done.emit(self.url, info)
+        except Exception:
+            self.failed.emit(self.url)
+
+
+def _probe_item(entry):
+    """Flat playlist entry -> picker item, or None without a usable URL"""
+    url = entry.get('url') or entry.get('webpage_url') or ''
+    vid = entry.get('id') or ''
+    if url and not url.startswith('http'):
+        url = f'https://www.youtube.com/watch?v={url}'
+    elif not url and vid:
+        url = f'https://www.youtube.com/watch?v={vid}'
+    if not url:
+        return None
+    # smallest variant that fills a picker row, not the maxres one
+    thumb = thumbs.pick_thumbnail(entry.get('thumbnails'), *thumbs.PICKER_SIZE)
+    if not thumb and vid:
+        thumb = f'https://i.ytimg.com/vi/{vid}/mqdefault.jpg'
+    return {
+        'id': vid,
+        'extractor': entry.get('ie_key') or entry.get('extractor_key') or '',
+        'url': url,
+        'title': entry.get('title') or url,
+        'duration': entry.get('duration'),
+        'thumbnail': thumb,
+    }
+
 
 class PlaylistProbeWorker(QThread):
-    """Fetch the flat list of videos in a channel/playlist URL (fast, no download)"""
-    done = pyqtSignal(list)   # [{'url', 'title', 'duration', 'thumbnail'}, ...]
+    """Stream the flat list of videos in a channel/playlist URL (fast, no
+    download). Entries are read lazily from the extractor and emitted page
+    by page; after PAGES_AHEAD pages the worker waits until the picker asks
+    for more (request_more), so a huge channel is never crawled up front.
+
+    Given the cached listing of the URL (core.listcache) it revalidates it
+    instead: on a newest-first listing the new head arrives via delta() and
+    the walk stops at the first video already known; entries beyond the
+    cached ones arrive via page(), on demand. The merged listing is stored
+    back into the cache."""
+    page = pyqtSignal(list)   # [{'id', 'extractor', 'url', 'title', 'duration', 'thumbnail'}, ...]
+    delta = pyqtSignal(list)  # new head entries, placed before the cached ones
+    done = pyqtSignal()       # listing exhausted (or synced up to the cache)
     failed = pyqtSignal(str)
 
-    MAX_ITEMS = 500
+    PAGE_SIZE = 50
+    PAGES_AHEAD = 2
 
-    def __init__(self, url, use_cookies=False, browser="", cookies_file=""):
+    def __init__(self, url, use_cookies=False, browser="", cookies_file="",
+                 cached=None):
         super().__init__()
         self.url = url
         self.use_cookies = use_cookies
         self.browser = browser
         self.cookies_file = cookies_file
+        # (items, complete) from the listing cache, shown before the probe runs
+        self.cached_items, self.cached_complete = cached or ([], False)
+        self._is_running = True
+        # entries wanted beyond the cached ones: the picker already has a
+        # screenful when a cached listing exists
+        self._limit = 0 if self.cached_items else self.PAGE_SIZE * self.PAGES_AHEAD
+        self._cond = threading.Condition()
+        self._head = []   # new entries before the cached ones
+        self._tail = []   # entries after them
+
+    def request_more(self):
+        """The user scrolled near the end: fetch one more page"""
+        with self._cond:
+            self._limit += self.PAGE_SIZE
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._is_running = False
+            self._cond.notify_all()
+
+    def _wait_for_demand(self, count):
+        """Block while count entries are enough; False once stopped"""
+        with self._cond:
+            while self._is_running and count >= self._limit:
+                self._cond.wait()
+            return self._is_running
+
+    def _iter_entries(self, ydl, info, depth=0):
+        """Entries of an unprocessed (process=False) playlist result, lazily.
+        Channel pages list their tabs (Videos / Shorts / Live) as links to
+        further listings of the same extractor: those are followed once."""
+        entries = info.get('entries') if isinstance(info, dict) else None
+        if entries is None:
+            return
+        for entry in entries:  # a generator / lazy list: pages load here
+            if not self._is_running:
+                return
+            if not isinstance(entry, dict):
+                continue
+            if entry.get('entries') is not None:
+                if depth < 1:
+                    yield from self._iter_entries(ydl, entry, depth + 1)
+            elif (depth < 1 and entry.get('_type') in ('url', 'url_transparent')
+                    and entry.get('ie_key')
+                    and entry.get('ie_key') == info.get('extractor_key')):
+                sub = ydl.extract_info(entry['url'], download=False,
+                                       process=False, ie_key=entry['ie_key'])
+                yield from self._iter_entries(ydl, sub, depth + 1)
+            else:
+                yield entry
+
+    def _walk(self, entries):
+        """Emit the entries as head deltas / tail pages and store the merged
+        listing. Returns True when the listing is known up to its end (or
+        the cached rest of it), False when stopped early."""
+        known = {it.get('id') or it.get('url') for it in self.cached_items}
+        in_head = bool(self.cached_items) and media_id.newest_first(self.url)
+        head_batch, batch = [], []
+        complete = False
+        try:
+            for entry in entries:
+                item = _probe_item(entry)
+                if item is None:
+                    continue
+                key = item['id'] or item['url']
+                if in_head:
+                    if key not in known:
+                        known.add(key)
+                        self._head.append(item)
+                        head_batch.append(item)
+                        if len(head_batch) >= self.PAGE_SIZE:
+                            self.delta.emit(head_batch)
+                            head_batch = []
+                        continue
+                    # reached the cached listing: everything new is known
+                    in_head = False
+                    if head_batch:
+                        self.delta.emit(head_batch)
+                        head_batch = []
+                    if self.cached_complete:
+                        complete = True
+                        return True
+                if key in known:
+                    # past the cached entries only when the picker needs more
+                    if (self.cached_items and media_id.newest_first(self.url)
+                            and not self._wait_for_demand(len(self._tail))):
+                        return False
+                    continue
+                known.add(key)
+                self._tail.append(item)
+                batch.append(item)
+                if len(batch) >= self.PAGE_SIZE:
+                    self.page.emit(batch)
+                    batch = []
+                    if not self._wait_for_demand(len(self._tail)):
+                        return False
+            if head_batch:
+                self.delta.emit(head_batch)
+            if batch:
+                self.page.emit(batch)
+            complete = self._is_running
+            return complete
+        finally:
+            # a head that never reached the cached entries would leave a gap
+            if not in_head:
+                if not (self._head or self._tail):
+                    # nothing new: stopping early says nothing about the
+                    # end of the listing, so the cached verdict stands
+                    complete = complete or self.cached_complete
+                listcache.get_listing_cache().put(
+                    self.url, self._head + self.cached_items + self._tail, complete)
 
     def run(self):
         try:
@@ -699,7 +1351,6 @@ class PlaylistProbeWorker(QThread):
                 'skip_download': True,
                 'quiet': True,
                 'no_warnings': True,
-                'playlistend': self.MAX_ITEMS,
                 'socket_timeout': 30,
                 'js_runtimes': get_js_runtimes(),
             }
@@ -709,46 +1360,18 @@ class PlaylistProbeWorker(QThread):
                 opts['cookiesfrombrowser'] = (self.browser,)
 
             with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(self.url, download=False)
-
-            entries = []
-            raw = info.get('entries') if isinstance(info, dict) else None
-            for entry in (raw or []):
-                if not isinstance(entry, dict):
-                    continue
-                # channel pages may nest tabs (Videos / Shorts) one level deep
-                if entry.get('entries'):
-                    for sub in entry['entries']:
-                        if isinstance(sub, dict):
-                            entries.append(sub)
-                else:
-                    entries.append(entry)
-
-            items = []
-            for e in entries[:self.MAX_ITEMS]:
-                url = e.get('url') or e.get('webpage_url') or ''
-                vid = e.get('id') or ''
-                if url and not url.startswith('http'):
-                    url = f'https://www.youtube.com/watch?v={url}'
-                elif not url and vid:
-                    url = f'https://www.youtube.com/watch?v={vid}'
-                if not url:
-                    continue
-                thumb = ''
-                thumbs = e.get('thumbnails')
-                if isinstance(thumbs, list) and thumbs:
-                    thumb = thumbs[-1].get('url', '')
-                if not thumb and vid:
-                    thumb = f'https://i.ytimg.com/vi/{vid}/mqdefault.jpg'
-                items.append({
-                    'url': url,
-                    'title': e.get('title') or url,
-                    'duration': e.get('duration'),
-                    'thumbnail': thumb,
-                })
-
-            if not items:
+                info = ydl.extract_info(self.url, download=False, process=False)
+                if isinstance(info, dict) and info.get('_type') in ('url', 'url_transparent'):
+                    # short/redirect link to the actual listing
+                    info = ydl.extract_info(info['url'], download=False, process=False,
+                                            ie_key=info.get('ie_key'))
+                finished = self._walk(self._iter_entries(ydl, info))
+
+            if not self._is_running or not finished:
+                return
+            if not (self._head or self.cached_items or self._tail):
                 raise RuntimeError('No videos found at this link')
-            self.done.emit(items)
+            self.done.emit()
         except Exception as e:
-            self.failed.emit(str(e))
+            if self._is_running:
+                self.failed.emit(str(e))
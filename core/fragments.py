@@ -0,0 +1,112 @@
+"""
+Adaptive fragment concurrency - how many fragments of one DASH/HLS stream
+are fetched at once.
+
+On a long, high-latency link a fragmented stream fetched one fragment at
+a time spends most of its time waiting for the first byte of the next
+fragment; a few fragments in flight hide that wait, too many only split
+the same bandwidth (and invite throttling). The tuner starts every site
+at a default level (config.FRAGMENTS_START) and learns from finished
+streams: the time one fragment takes per connection (latency) and the
+stream's throughput. While fragments are slow enough to be latency-bound
+it tries a higher level; a higher level that did not raise throughput is
+dropped again, and once settled a step up is re-probed now and then.
+The level is the job's demand on the connection budget (core.connections),
+which may hand out fewer connections when many jobs run.
+"""
+import threading
+
+import config
+
+
+class _Site:
+    __slots__ = ('level', 'trial_from', 'quiet', 'throughput')
+
+    def __init__(self, level):
+        self.level = level
+        self.trial_from = None   # level before an unconfirmed increase
+        self.quiet = 0           # settled streams since the last change
+        self.throughput = {}     # level -> smoothed bytes/s
+
+
+class FragmentTuner:
+    """Per-site fragment concurrency, hill-climbing on observed throughput
+    (thread-safe)"""
+
+    MIN_FRAGMENTS = 8          # shorter streams say nothing reliable
+    LATENCY_BOUND = 0.25       # s per fragment and connection: worth raising
+    GAIN = 1.1                 # an increase must add 10% throughput to stay
+    PROBE_AFTER = 5            # settled streams before trying one step up
+    SMOOTHING = 0.5            # weight of a new sample in the averages
+
+    def __init__(self, start=None, cap=None):
+        self.start = start if start is not None else config.FRAGMENTS_START
+        self.cap = cap or config.FRAGMENTS_PER_JOB
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def _site(self, site):
+        state = self._sites.get(site)
+        if state is None:
+            level = self.start.get(site, self.start.get('', 4))
+            state = self._sites[site] = _Site(max(1, min(self.cap, level)))
+        return state
+
+    def level(self, site):
+        """Fragments to fetch at once for a stream of this site"""
+        with self._lock:
+            return self._site(site).level
+
+    def _step_up(self, level):
+        return min(self.cap, level * 2 if level < 4 else level + 2)
+
+    def observe(self, site, level, fragments, nbytes, seconds):
+        """A stream of site moved nbytes in fragments fragments over
+        seconds with level fragments in flight; returns the site's new
+        level, or None when it stays"""
+        if fragments < self.MIN_FRAGMENTS or seconds <= 0 or nbytes <= 0 or level < 1:
+            return None
+        throughput = nbytes / seconds
+        latency = seconds * level / fragments
+        with self._lock:
+            state = self._site(site)
+            old = state.throughput.get(level)
+            state.throughput[level] = throughput if old is None else (
+                old + (throughput - old) * self.SMOOTHING)
+            if level != state.level:
+                return None  # the budget gave this job less; no verdict
+            current = state.level
+            if state.trial_from is not None:
+                base = state.throughput.get(state.trial_from, 0.0)
+                if state.throughput[current] < base * self.GAIN:
+                    state.level = state.trial_from  # did not pay off
+                    state.trial_from = None
+                    state.quiet = 0
+                    return state.level
+                state.trial_from = None
+            state.quiet += 1
+            if current >= self.cap or latency < self.LATENCY_BOUND:
+                return None  # bandwidth-bound: more fragments only split it
+            higher = self._step_up(current)
+            if higher in state.throughput and state.quiet < self.PROBE_AFTER:
+                return None  # tried recently without a gain
+            state.trial_from = current
+            state.level = higher
+            state.quiet = 0
+            return higher
+
+
+_tuner = None
+_tuner_lock = threading.Lock()
+
+
+def get_fragment_tuner():
+    """The process-wide fragment concurrency tuner"""
+    global _tuner
+    with _tuner_lock:
+        if _tuner is None:
+            _tuner = FragmentTuner()
+        return _tuner
+
+
+__all__ = ['FragmentTuner', 'get_fragment_tuner']
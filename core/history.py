@@ -0,0 +1,147 @@
+"""
+Download history - every finished download, for duplicate detection.
+
+A small SQLite database in runtime/history.sqlite3 instead of the JSON
+blob in QSettings that was rewritten in full after every download and
+capped at 300 entries. Rows are indexed by (media type, URL), by
+(media type, media id) - "<extractor> <id>", so another link to the same
+video is recognized too - and by file path; inserts and lookups stay
+O(log n) with no size limit.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from core.media_id import canonical
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    media_type TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    media_id   TEXT,
+    file       TEXT NOT NULL DEFAULT '',
+    count      INTEGER NOT NULL DEFAULT 1,
+    updated    REAL NOT NULL,
+    PRIMARY KEY (media_type, url)
+);
+CREATE INDEX IF NOT EXISTS downloads_media_id ON downloads (media_type, media_id);
+CREATE INDEX IF NOT EXISTS downloads_file ON downloads (file);
+"""
+
+
+def media_id(extractor, vid):
+    """'<extractor> <id>' as stored in the media_id column, or None"""
+    if not extractor or not vid:
+        return None
+    return f'{str(extractor).lower()} {vid}'
+
+
+class DownloadHistory:
+    """Finished downloads per (media type, URL) (thread-safe)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None  # opened on first use
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def get(self, media_type, url, mid=None):
+        """{'file', 'count'} of an earlier download of url (or of the same
+        media id under another URL), or None"""
+        try:
+            with self._lock:
+                db = self._conn()
+                row = db.execute(
+                    'SELECT file, count FROM downloads WHERE media_type=? AND url=?',
+                    (media_type, url)).fetchone()
+                if row is None and mid:
+                    row = db.execute(
+                        'SELECT file, count FROM downloads WHERE media_type=? '
+                        'AND media_id=? ORDER BY updated DESC LIMIT 1',
+                        (media_type, mid)).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+        if row is None:
+            return None
+        return {'file': row[0], 'count': row[1]}
+
+    def record(self, media_type, url, filename, suffix='', mid=None):
+        """Remember a finished download. suffix is the " (n)" of a copy;
+        count keeps the highest copy number for the next one."""
+        old = self.get(media_type, url, mid)
+        if suffix:
+            digits = ''.join(ch for ch in suffix if ch.isdigit())
+            count = int(digits) if digits else int(old['count'] if old else 1) + 1
+        else:
+            count = max(int(old['count'] if old else 0), 1)
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    db.execute(
+                        'INSERT OR REPLACE INTO downloads '
+                        '(media_type, url, media_id, file, count, updated) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (media_type, url, mid, filename, count, time.time()))
+        except (sqlite3.Error, OSError):
+            pass
+
+    def import_legacy(self, entries):
+        """One-time import of the old QSettings blob:
+        {"media|url": {"file": path, "count": n}}. Returns the number of
+        rows read, None when the database is unavailable."""
+        rows = []
+        now = time.time()
+        for i, (key, entry) in enumerate(entries.items()):
+            media_type, sep, url = str(key).partition('|')
+            if not sep or not url or not isinstance(entry, dict):
+                continue
+            try:
+                count = int(entry.get('count', 1) or 1)
+            except (TypeError, ValueError):
+                count = 1
+            # the old blob had no IDs: derive them from the link where it
+            # is canonical, so legacy downloads match other link forms
+            key = canonical(url)
+            # keep the old insertion order as recency
+            rows.append((media_type, url, media_id(*key) if key else None,
+                         str(entry.get('file') or ''), count, now - len(entries) + i))
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    db.executemany(
+                        'INSERT OR IGNORE INTO downloads '
+                        '(media_type, url, media_id, file, count, updated) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        rows)
+        except (sqlite3.Error, OSError):
+            return None
+        return len(rows)
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """The process-wide download history"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = DownloadHistory(config.HISTORY_DB)
+        return _history
+
+
+__all__ = ['DownloadHistory', 'get_history', 'media_id']
@@ -0,0 +1,263 @@
+"""
+Job store - the download queue behind the main window's scheduler.
+
+Jobs are compact slotted records indexed by id and by (media key, media
+type), so "is this video queued or running already?" is O(1). Pending
+jobs wait by priority level; within a level every batch (a pasted link, a
+picker selection, a mirror) has its own FIFO and the batches take turns,
+so a 400-video playlist cannot starve a link pasted after it. Per-site
+caps keep jobs of one extractor from taking every slot. Cancelling or
+re-prioritizing a pending job only marks its old queue entry stale; the
+entry is dropped when it comes up. With 100k jobs waiting every operation
+stays O(1) per job, plus a scan over the (few) levels and batches.
+"""
+import collections
+import itertools
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'  # completed, failed or canceled: out of the store
+
+# Priorities, most urgent first. Only batch jobs are ever preempted.
+PRIORITY_TOP = -1      # moved to the top by the user
+PRIORITY_HIGH = 0      # a single pasted link
+PRIORITY_NORMAL = 1    # part of a picker selection or a mirror
+
+# Share of the global bandwidth cap (core.bandwidth) and of the connection
+# budget (core.connections) per priority
+BANDWIDTH_WEIGHTS = {PRIORITY_TOP: 4.0, PRIORITY_HIGH: 2.0, PRIORITY_NORMAL: 1.0}
+
+
+class Job:
+    """One download request, as queued by the UI"""
+    __slots__ = ('dl_id', 'media_type', 'url', 'key', 'site', 'state',
+                 'priority', 'batch', 'seq', 'use_cookies', 'browser',
+                 'cookies_file', 'resolution', 'video_format', 'audio_format',
+                 'output_dir', 'overwrite', 'filename_suffix')
+
+    def __init__(self, dl_id, media_type, url, key, site='',
+                 priority=PRIORITY_HIGH, batch=None, use_cookies=False,
+                 browser="", cookies_file="", resolution="", video_format="",
+                 audio_format="", output_dir="", overwrite=False,
+                 filename_suffix=""):
+        self.dl_id = dl_id
+        self.media_type = media_type
+        self.url = url
+        self.key = key    # core.media_id.media_key(url)
+        self.site = site  # core.media_id.site(url)
+        self.state = QUEUED
+        self.priority = priority
+        self.batch = batch or dl_id
+        self.seq = 0      # matches the job's live queue entry
+        self.use_cookies = use_cookies
+        self.browser = browser
+        self.cookies_file = cookies_file
+        self.resolution = resolution
+        self.video_format = video_format
+        self.audio_format = audio_format
+        self.output_dir = output_dir
+        self.overwrite = overwrite
+        self.filename_suffix = filename_suffix
+
+
+class JobStore:
+    """Queued and running jobs (used from the GUI thread only).
+    site_limit(site) -> max running jobs of a site, or None for no cap."""
+
+    def __init__(self, site_limit=None):
+        self.site_limit = site_limit or (lambda site: None)
+        self._jobs = {}       # dl_id -> Job (queued or running)
+        self._running = {}    # dl_id -> Job, running only
+        self._by_key = {}     # (key, media type) -> dl_id
+        # priority -> OrderedDict(batch -> deque of (seq, dl_id)); batches
+        # rotate to the end when served
+        self._levels = {}
+        self._seq = itertools.count(1)
+        self._counts = {QUEUED: 0, RUNNING: 0}
+        self._site_running = collections.Counter()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def get(self, dl_id):
+        return self._jobs.get(dl_id)
+
+    def pending_count(self):
+        return self._counts[QUEUED]
+
+    def running_count(self):
+        return self._counts[RUNNING]
+
+    def busy(self, key, media_type):
+        """Is a job for this media key queued or running?"""
+        return (key, media_type) in self._by_key
+
+    def add(self, job):
+        """Queue a job at the end of its batch"""
+        self._jobs[job.dl_id] = job
+        self._by_key[(job.key, job.media_type)] = job.dl_id
+        self._counts[QUEUED] += 1
+        self._push(job)
+
+    def _push(self, job, front=False):
+        job.seq = next(self._seq)
+        batches = self._levels.setdefault(job.priority, collections.OrderedDict())
+        queue = batches.get(job.batch)
+        if queue is None:
+            queue = batches[job.batch] = collections.deque()
+        if front:
+            queue.appendleft((job.seq, job.dl_id))
+            batches.move_to_end(job.batch, last=False)
+        else:
+            queue.append((job.seq, job.dl_id))
+
+    def _head(self, queue):
+        """First live job of a batch queue, dropping stale entries"""
+        while queue:
+            seq, dl_id = queue[0]
+            job = self._jobs.get(dl_id)
+            if job is not None and job.state == QUEUED and job.seq == seq:
+                return job
+            queue.popleft()
+        return None
+
+    def _can_run(self, job):
+        limit = self.site_limit(job.site)
+        return limit is None or self._site_running[job.site] < limit
+
+    def _find(self):
+        """(priority, batch, job) of the job to start next, or None: the
+        most urgent level first, batches in turn, skipping sites at cap"""
+        for priority in sorted(self._levels):
+            batches = self._levels[priority]
+            for batch in list(batches):
+                job = self._head(batches[batch])
+                if job is None:
+                    del batches[batch]
+                elif self._can_run(job):
+                    return priority, batch, job
+            if not batches:
+                del self._levels[priority]
+        return None
+
+    def pop_next(self):
+        """Take the next job and mark it running; None when nothing can
+        start (empty, or every waiting site is at its cap)"""
+        found = self._find()
+        if found is None:
+            return None
+        priority, batch, job = found
+        batches = self._levels[priority]
+        batches[batch].popleft()
+        batches.move_to_end(batch)  # round-robin between batches
+        self._set_state(job, RUNNING)
+        self._site_running[job.site] += 1
+        return job
+
+    def move_to_top(self, dl_id):
+        """Start this queued job before every other one"""
+        job = self._jobs.get(dl_id)
+        if job is None or job.state != QUEUED:
+            return False
+        job.priority = PRIORITY_TOP
+        self._push(job, front=True)
+        return True
+
+    def requeue(self, dl_id):
+        """Put a running job back at the front of its batch (preempted)"""
+        job = self._jobs.get(dl_id)
+        if job is None or job.state != RUNNING:
+            return None
+        self._release_site(job)
+        self._set_state(job, QUEUED)
+        self._push(job, front=True)
+        return job
+
+    def preemption_victim(self, job, pausable=None, site=None):
+        """The running batch job to pause so that job can start: the least
+        urgent one less urgent than job, newest first; None if there is
+        none. pausable(job) can veto candidates (e.g. converting); site
+        limits the candidates to one site (job is blocked by its cap)."""
+        victims = [j for j in self._running.values()
+                   if j.priority >= PRIORITY_NORMAL
+                   and j.priority > job.priority
+                   and (site is None or j.site == site)
+                   and (pausable is None or pausable(j))]
+        if not victims:
+            return None
+        return max(victims, key=lambda j: (j.priority, j.seq))
+
+    def preemption(self, slots_free, pausable=None):
+        """(job, victim): the most urgent waiting job that cannot start
+        without pausing a batch job - every slot is taken (slots_free
+        False) or its site is at its cap - and the running job to pause
+        for it (on the same site for a capped one); None when there is
+        none"""
+        for priority in sorted(self._levels):
+            if priority >= PRIORITY_NORMAL:
+                break  # batch jobs never preempt each other
+            for queue in list(self._levels[priority].values()):
+                job = self._head(queue)
+                if job is None:
+                    continue
+                capped = not self._can_run(job)
+                if slots_free and not capped:
+                    continue  # starts without help
+                victim = self.preemption_victim(
+                    job, pausable, site=job.site if capped else None)
+                if victim is not None:
+                    return job, victim
+        return None
+
+    def take(self, job):
+        """Mark a queued job running out of turn (it won a preemption);
+        its queue entry is dropped as stale when it comes up"""
+        if job.state != QUEUED:
+            return False
+        self._set_state(job, RUNNING)
+        self._site_running[job.site] += 1
+        return True
+
+    def finish(self, dl_id):
+        """Drop a job (done, failed or canceled - queued or running);
+        returns it, or None when unknown"""
+        job = self._jobs.pop(dl_id, None)
+        if job is None:
+            return None
+        if job.state == RUNNING:
+            self._release_site(job)
+        self._set_state(job, FINISHED)
+        if self._by_key.get((job.key, job.media_type)) == dl_id:
+            del self._by_key[(job.key, job.media_type)]
+        if not self._counts[QUEUED]:
+            self._levels.clear()  # only stale leftovers remain
+        return job
+
+    def clear(self):
+        self._jobs.clear()
+        self._running.clear()
+        self._by_key.clear()
+        self._levels.clear()
+        self._counts = {QUEUED: 0, RUNNING: 0}
+        self._site_running.clear()
+
+    def _release_site(self, job):
+        self._site_running[job.site] -= 1
+        if self._site_running[job.site] <= 0:
+            del self._site_running[job.site]
+
+    def _set_state(self, job, state):
+        if job.state in self._counts:
+            self._counts[job.state] -= 1
+        job.state = state
+        if state == RUNNING:
+            self._running[job.dl_id] = job
+        else:
+            self._running.pop(job.dl_id, None)
+        if state in self._counts:
+            self._counts[state] += 1
+
+
+__all__ = ['Job', 'JobStore', 'QUEUED', 'RUNNING', 'FINISHED', 'PRIORITY_TOP',
+           'PRIORITY_HIGH', 'PRIORITY_NORMAL', 'BANDWIDTH_WEIGHTS']
@@ -0,0 +1,95 @@
+"""
+Listing cache - the flat video lists of probed channels/playlists.
+
+One JSON file per collection URL in runtime/cache/listings holding the
+picker items in listing order and whether the listing was walked to its
+end. The picker shows a cached listing at once while the probe revalidates
+it: channels list newest first, so the probe stops at the first video it
+already knows and only the new head is fetched (one page for a channel
+polled daily).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import config
+from core.media_id import normalize_url
+
+
+class ListingCache:
+    """Collection URL -> cached listing, LRU-bounded by count (thread-safe)"""
+
+    def __init__(self, root, max_entries):
+        self.root = root
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _path(self, url):
+        name = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, name + '.json')
+
+    def get(self, url):
+        """(items, complete) of the cached listing, or None"""
+        path = self._path(url)
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                os.utime(path)  # LRU: mark as recently used
+            except (OSError, ValueError):
+                return None
+        items = entry.get('items')
+        if not isinstance(items, list) or not items:
+            return None
+        return items, bool(entry.get('complete'))
+
+    def put(self, url, items, complete):
+        """Store the listing (best-effort)"""
+        if not items:
+            return
+        entry = {'url': url, 'updated': time.time(),
+                 'complete': bool(complete), 'items': items}
+        path = self._path(url)
+        with self._lock:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                tmp = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp, path)
+                self._evict()
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop the least recently used listings beyond max_entries
+        (caller holds the lock)"""
+        try:
+            files = [(e.stat().st_mtime, e.path) for e in os.scandir(self.root)
+                     if e.name.endswith('.json')]
+        except OSError:
+            return
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_listing_cache():
+    """The process-wide listing cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ListingCache(config.LIST_CACHE_DIR, config.LIST_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+__all__ = ['ListingCache', 'get_listing_cache']
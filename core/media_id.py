@@ -0,0 +1,163 @@
+"""
+Canonical media IDs - which video (or collection) a link points at.
+
+youtu.be/X, m.youtube.com/watch?v=X&t=10, /shorts/X and the same link with
+tracking parameters are one video. Duplicate detection, busy checks, the
+metadata cache and single-flight extraction key on the canonical form
+instead of the raw string, so they neither download twice nor miss a hit.
+
+Well-known sites are recognized with a few regular expressions - the same
+(extractor key, id) pairs yt-dlp reports, lowercased - without importing
+yt-dlp and its extractor set; any other link falls back to its normalized
+URL.
+"""
+import re
+import urllib.parse
+
+# Tracking parameters that never change what a link points at, on any
+# host (plus utm_*). Names like s, t or start are real parameters on
+# other sites, so they are dropped only where they are known to be noise.
+_TRACKING_PARAMS = frozenset(('si', 'fbclid', 'gclid', 'igshid', 'igsh'))
+
+_YOUTUBE_HOSTS = ('youtube.com', 'youtube-nocookie.com', 'music.youtube.com')
+
+_YOUTUBE_PARAMS = frozenset((
+    'feature', 'pp', 't', 'start', 'time_continue', 'ab_channel', 'app',
+    'embeds_referring_euri',
+))
+# host (without www./m.) -> site-specific parameters that are noise there
+_SITE_PARAMS = dict.fromkeys(_YOUTUBE_HOSTS + ('youtu.be',), _YOUTUBE_PARAMS)
+_SITE_PARAMS.update({
+    'twitter.com': frozenset(('s', 't', 'ref_src')),
+    'x.com': frozenset(('s', 't', 'ref_src')),
+    'tiktok.com': frozenset(('is_from_webapp', 'sender_device', 'share')),
+    'instagram.com': frozenset(('ref',)),
+})
+
+# (extractor, host regex, path regex with the id as group 1)
+_SITES = (
+    ('vimeo', re.compile(r'^(?:player\.)?vimeo\.com$'),
+     re.compile(r'^/(?:video/)?(\d+)(?:/|$)')),
+    ('dailymotion', re.compile(r'^dailymotion\.com$'),
+     re.compile(r'^/video/([a-z0-9]+)')),
+    ('dailymotion', re.compile(r'^dai\.ly$'), re.compile(r'^/([a-z0-9]+)')),
+    ('twitchvod', re.compile(r'^twitch\.tv$'), re.compile(r'^/videos/(\d+)')),
+    ('tiktok', re.compile(r'^tiktok\.com$'), re.compile(r'^/@[^/]+/video/(\d+)')),
+    ('twitter', re.compile(r'^(?:twitter|x)\.com$'),
+     re.compile(r'^/[^/]+/status/(\d+)')),
+    ('instagram', re.compile(r'^instagram\.com$'),
+     re.compile(r'^/(?:[^/]+/)?(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)')),
+)
+
+_YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_YOUTUBE_PATH_RE = re.compile(r'^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})(?:/|$)')
+# Channel pages (and their Videos/Shorts/Live tabs) list newest first
+_CHANNEL_PATH_RE = re.compile(r'^/(?:@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)(?:/|$)')
+
+
+def _split(url):
+    """(host without www./m., path, query dict) or None"""
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+    except (AttributeError, ValueError):
+        return None
+    host = parts.netloc.lower().rsplit('@', 1)[-1].split(':', 1)[0]
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = urllib.parse.parse_qs(parts.query, keep_blank_values=True)
+    return host, parts.path, query
+
+
+def canonical(url):
+    """(extractor, id) of a single-video link, without any network access
+    or yt-dlp; None when the site or link form is not known here"""
+    split = _split(url or '')
+    if split is None:
+        return None
+    host, path, query = split
+    if host in _YOUTUBE_HOSTS:
+        vid = (query.get('v') or [''])[0] if path in ('/watch', '/watch/') else ''
+        if not vid:
+            m = _YOUTUBE_PATH_RE.match(path)
+            vid = m.group(1) if m else ''
+        return ('youtube', vid) if _YOUTUBE_ID_RE.match(vid) else None
+    if host == 'youtu.be':
+        vid = path.strip('/').split('/', 1)[0]
+        return ('youtube', vid) if _YOUTUBE_ID_RE.match(vid) else None
+    for extractor, host_re, path_re in _SITES:
+        if host_re.match(host):
+            m = path_re.match(path)
+            if m:
+                return extractor, m.group(1)
+    return None
+
+
+def normalize_url(url):
+    """Link with host case, www./m., fragment, trailing slash and tracking
+    parameters (the host's own noise parameters too) removed, remaining
+    parameters sorted"""
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+    except (AttributeError, ValueError):
+        return url
+    split = _split(url)
+    host = split[0] if split else parts.netloc.lower()
+    path = parts.path.rstrip('/') or '/'
+    noise = _SITE_PARAMS.get(host, frozenset())
+    query = sorted((k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in _TRACKING_PARAMS and k.lower() not in noise
+                   and not k.lower().startswith('utm_'))
+    qs = urllib.parse.urlencode(query)
+    return f'{host}{path}?{qs}' if qs else f'{host}{path}'
+
+
+def media_key(url):
+    """Hashable identity of a link: 'extractor id' when known, else its
+    normalized URL"""
+    key = canonical(url)
+    if key is not None:
+        return f'{key[0]} {key[1]}'
+    return normalize_url(url)
+
+
+def site(url):
+    """Extractor of a known link, else its host - the unit of per-site
+    concurrency limits"""
+    key = canonical(url)
+    if key is not None:
+        return key[0]
+    split = _split(url or '')
+    if split is None:
+        return ''
+    if split[0] in _YOUTUBE_HOSTS or split[0] == 'youtu.be':
+        return 'youtube'
+    return split[0]
+
+
+def is_collection(url):
+    """Channel or playlist link (multiple videos)?"""
+    split = _split(url or '')
+    if split is None:
+        return False
+    host, path, query = split
+    if canonical(url) is not None:
+        return False  # a video, even when it carries &list=
+    if host in _YOUTUBE_HOSTS:
+        return bool(path.rstrip('/') == '/playlist' and query.get('list')
+                    or _CHANNEL_PATH_RE.match(path))
+    low = url.lower()
+    return any(p in low for p in ("playlist?list=", "/playlist/", "/channel/",
+                                  "/c/", "/user/", "/@"))
+
+
+def newest_first(url):
+    """True for listings whose new entries always appear at the top"""
+    split = _split(url or '')
+    if split is None or 'list' in split[2]:
+        return False
+    return bool(_CHANNEL_PATH_RE.match(split[1]))
+
+
+__all__ = ['canonical', 'is_collection', 'media_key', 'newest_first', 'normalize_url',
+           'site']
@@ -0,0 +1,282 @@
+"""
+Persistent metadata cache - extraction results shared by all workers.
+
+Entries live in runtime/cache/meta, one JSON file per video keyed by
+(extractor, video id). Links whose id is known up front (core.media_id)
+find their entry directly; an alias index maps the other (normalized)
+URLs that resolved to it.
+The info dict is stored WITHOUT its expiring stream URLs - those are kept
+next to it with their own expiry. So an entry serves titles and format
+listings for hours, but replaces a network extraction (retries, duplicate
+requests, Audio after Video of the same link) only while the stream URLs
+are still valid.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import config
+from core.media_id import canonical, normalize_url
+
+# Per-format (and top-level, for single-format results) keys that point at
+# the media itself and expire with the signed stream URL
+_STREAM_KEYS = ('url', 'manifest_url', 'fragment_base_url', 'fragments')
+
+# Left behind when the dict was already through format selection (e.g. the
+# info printed by yt-dlp.exe); selection must run again for the next job
+_SELECTION_KEYS = (
+    'requested_formats', 'requested_downloads', 'requested_subtitles',
+    'format_id', 'format', 'format_note', 'ext', 'protocol', 'width',
+    'height', 'resolution', 'fps', 'dynamic_range', 'aspect_ratio', 'vcodec',
+    'acodec', 'vbr', 'abr', 'tbr', 'asr', 'audio_channels', 'filesize',
+    'filesize_approx', 'filepath', 'filename', 'http_headers',
+    'downloader_options', 'stretched_ratio',
+) + _STREAM_KEYS
+
+# Stream URLs are treated as stale this long before their real expiry
+_EXPIRY_MARGIN = 5 * 60
+
+
+class _Uncacheable(Exception):
+    """The info dict holds something that cannot be stored as JSON"""
+
+
+def _jsonable(value):
+    """Deep copy as plain JSON types; private '__' keys are dropped"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()
+                if not str(k).startswith('__')}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    raise _Uncacheable(type(value).__name__)
+
+
+def _url_expiry(url):
+    """Expiry timestamp embedded in a signed stream URL, or None.
+    googlevideo URLs carry it as ?expire=N, manifests as /expire/N/."""
+    if not isinstance(url, str):
+        return None
+    try:
+        parts = urllib.parse.urlsplit(url)
+        value = urllib.parse.parse_qs(parts.query).get('expire', [None])[0]
+        if value is None and '/expire/' in parts.path:
+            value = parts.path.split('/expire/', 1)[1].split('/', 1)[0]
+        return int(value) if value else None
+    except (ValueError, IndexError):
+        return None
+
+
+def split_streams(info):
+    """info dict -> (stable part, stream part, stream expiry timestamp)"""
+    info = _jsonable(info)
+    formats = info.get('formats')
+    if isinstance(formats, list) and formats:
+        for key in _SELECTION_KEYS:
+            info.pop(key, None)
+        streams = {'formats': []}
+        for fmt in formats:
+            streams['formats'].append(
+                {k: fmt.pop(k) for k in _STREAM_KEYS if k in fmt})
+    else:
+        streams = {'top': {k: info.pop(k) for k in _STREAM_KEYS if k in info}}
+
+    expiries = [e for e in (_url_expiry(s.get('url')) or _url_expiry(s.get('manifest_url'))
+                            for s in streams.get('formats') or [streams.get('top', {})])
+                if e]
+    expires = time.time() + config.META_STREAM_TTL
+    if expiries:
+        expires = min(expires, min(expiries) - _EXPIRY_MARGIN)
+    return info, streams, expires
+
+
+def merge_streams(info, streams):
+    """Inverse of split_streams: put the stream URLs back into the info dict"""
+    info = copy.deepcopy(info)
+    if 'top' in streams:
+        info.update(streams['top'])
+        return info
+    for fmt, stream in zip(info.get('formats') or [], streams.get('formats') or []):
+        fmt.update(stream)
+    return info
+
+
+class MetadataCache:
+    """Size-bounded LRU of extraction results on disk (thread-safe)"""
+
+    def __init__(self, root, ttl, max_entries, max_bytes):
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._aliases = None  # url -> entry name, loaded on first use
+
+    # ------------------------------------------------------------- paths
+
+    @staticmethod
+    def entry_name(extractor, video_id):
+        raw = f'{str(extractor).lower()}:{video_id}'.encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def _entry_path(self, name):
+        return os.path.join(self.root, name + '.json')
+
+    def _index_path(self):
+        return os.path.join(self.root, 'index.json')
+
+    def _lookup(self, url):
+        """Entry name for url, or None (caller holds the lock)"""
+        key = canonical(url)
+        if key is not None:
+            return self.entry_name(*key)
+        return self._load_aliases().get(normalize_url(url))
+
+    def _load_aliases(self):
+        if self._aliases is None:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    self._aliases = json.load(f)
+                if not isinstance(self._aliases, dict):
+                    self._aliases = {}
+            except (OSError, ValueError):
+                self._aliases = {}
+        return self._aliases
+
+    def _write_json(self, path, data):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    # ---------------------------------------------------------------- API
+
+    def get(self, url, streams=True):
+        """Cached info dict for url, or None.
+        streams=True  - complete dict, only while its stream URLs are valid
+                        (usable for downloading);
+        streams=False - dict without stream URLs (titles, format lists)."""
+        with self._lock:
+            name = self._lookup(url)
+            if not name:
+                return None
+            path = self._entry_path(name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._load_aliases().pop(normalize_url(url), None)
+                return None
+            now = time.time()
+            if entry.get('expires', 0) < now:
+                return None
+            if streams and (not entry.get('streams')
+                            or entry.get('stream_expires', 0) < now):
+                return None
+            try:
+                os.utime(path)  # LRU: mark as recently used
+            except OSError:
+                pass
+        if streams:
+            return merge_streams(entry['info'], entry['streams'])
+        return entry['info']
+
+    def put(self, url, info):
+        """Store an extraction result; silently skips what cannot be cached"""
+        if not isinstance(info, dict) or info.get('_type', 'video') != 'video':
+            return
+        if info.get('is_live') or not info.get('id') or not (
+                info.get('extractor_key') or info.get('extractor')):
+            return
+        try:
+            stable, streams, stream_expires = split_streams(info)
+        except _Uncacheable:
+            return
+        name = self.entry_name(info.get('extractor_key') or info['extractor'],
+                               info['id'])
+        now = time.time()
+        entry = {
+            'key': [info.get('extractor_key') or info['extractor'], info['id']],
+            'created': now,
+            'expires': now + self.ttl,
+            'stream_expires': stream_expires,
+            'info': stable,
+            'streams': streams,
+        }
+        with self._lock:
+            try:
+                self._write_json(self._entry_path(name), entry)
+                aliases = self._load_aliases()
+                for link in (url, info.get('webpage_url')):
+                    if link and canonical(link) is None:
+                        aliases[normalize_url(link)] = name
+                self._evict()
+                self._write_json(self._index_path(), self._aliases)
+            except OSError:
+                pass
+
+    def invalidate(self, url):
+        """Forget the stream URLs for url (they failed, e.g. HTTP 403)"""
+        with self._lock:
+            name = self._lookup(url)
+            if not name:
+                return
+            path = self._entry_path(name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                entry['streams'] = None
+                self._write_json(path, entry)
+            except (OSError, ValueError):
+                pass
+
+    def _evict(self):
+        """Drop least recently used entries beyond the count/size limits
+        (caller holds the lock)"""
+        entries = []
+        total = 0
+        try:
+            for e in os.scandir(self.root):
+                if e.name.endswith('.json') and e.name != 'index.json':
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path, e.name[:-5]))
+                    total += st.st_size
+        except OSError:
+            return
+        entries.sort()
+        dropped = set()
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path, name = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            dropped.add(name)
+        if dropped:
+            self._aliases = {u: n for u, n in self._aliases.items()
+                             if n not in dropped}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """The process-wide metadata cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache(config.META_CACHE_DIR, config.META_CACHE_TTL,
+                                   config.META_CACHE_MAX_ENTRIES,
+                                   config.META_CACHE_MAX_BYTES)
+        return _cache
+
+
+__all__ = ['MetadataCache', 'get_metadata_cache']
@@ -0,0 +1,288 @@
+"""
+Segmented transfer - one progressive file over several HTTP connections.
+
+A direct MP4/WebM stream fetched over one connection is capped by whatever
+the server (or the route) allows a single connection. When the server
+serves byte ranges, the file is preallocated and split into ranges that
+are fetched concurrently, each written in place. Like a download
+accelerator, a connection that finishes its range takes over half of the
+largest range still open, so all connections stay busy until the end
+instead of waiting on the slowest one.
+
+When a transfer stops early (canceled, paused for a more urgent job, or
+failed) the ranges still open are saved next to the file (<path>.ranges),
+and the next transfer of the same file fetches only those. The sidecar
+is written once every connection has stopped, so it never claims bytes
+that are not on disk.
+
+The transfer is independent of the backend: opener(url, headers) returns
+a response (status, headers, read(n), close()) - urllib by default,
+YoutubeDL.urlopen for the yt-dlp module (cookies, proxy, impersonation).
+"""
+import json
+import os
+import threading
+import time
+import urllib.request
+
+CHUNK = 64 * 1024            # bytes read (and written) at a time
+MIN_SPLIT = 2 * 1024 * 1024  # a range shorter than this is not split again
+RETRIES = 5                  # failed requests per range before giving up
+
+
+class RangesUnsupported(Exception):
+    """The server ignores Range requests: fall back to a plain download"""
+
+
+class DownloadCanceled(Exception):
+    pass
+
+
+def _urllib_opener(url, headers):
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30)
+
+
+class _Range:
+    __slots__ = ('pos', 'end', 'taken')
+
+    def __init__(self, pos, end):
+        self.pos = pos   # next byte to fetch
+        self.end = end   # exclusive; lowered when another connection steals
+        self.taken = False  # a connection works on it
+
+
+class SegmentedDownload:
+    """Fetch url into path over up to `segments` concurrent range requests.
+    throttle(nbytes) is called by the transfer threads after every chunk
+    (bandwidth limiting); cancelled() and paused() are polled; chunk_size
+    caps the bytes asked for in one request (some CDNs throttle long
+    ranges)."""
+
+    def __init__(self, url, path, headers=None, segments=4, opener=None,
+                 throttle=None, cancelled=None, paused=None, chunk_size=None):
+        self.url = url
+        self.path = path
+        self.headers = dict(headers or {})
+        self.segments = max(1, segments)
+        self.opener = opener or _urllib_opener
+        self.throttle = throttle
+        self.cancelled = cancelled or (lambda: False)
+        self.paused = paused or (lambda: False)
+        self.chunk_size = chunk_size
+        self.state_path = path + '.ranges'
+        self.total = None
+        self.done = 0
+        self._lock = threading.Lock()
+        self._ranges = []
+        self._error = None
+
+    def _open(self, start, end):
+        """Response for bytes [start, end)"""
+        headers = dict(self.headers)
+        headers['Range'] = f'bytes={start}-{end - 1}'
+        return self.opener(self.url, headers)
+
+    def probe(self):
+        """Total size when the server serves byte ranges, else None"""
+        try:
+            response = self._open(0, 1)
+        except Exception:
+            return None
+        try:
+            status = getattr(response, 'status', None) or response.getcode()
+            content_range = response.headers.get('Content-Range') or ''
+            accept = (response.headers.get('Accept-Ranges') or '').lower()
+        finally:
+            response.close()
+        # a 206 with a full size is the real proof; Accept-Ranges alone lies
+        # on some servers, and 'none' rules ranges out
+        if status != 206 or accept == 'none' or '/' not in content_range:
+            return None
+        try:
+            self.total = int(content_range.rsplit('/', 1)[1])
+        except ValueError:
+            return None
+        return self.total if self.total > 0 else None
+
+    def has_state(self):
+        """Is there an interrupted transfer of this file to resume?"""
+        return os.path.exists(self.state_path)
+
+    def discard(self):
+        """Drop an interrupted transfer (file and sidecar): a preallocated
+        file must never be taken for a partial download by another
+        downloader"""
+        if not self.has_state():
+            return
+        for name in (self.path, self.state_path):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def _load_state(self, total):
+        """Open ranges saved by an interrupted transfer of this file, or
+        None when there is nothing (valid) to resume"""
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('total') != total or os.path.getsize(self.path) != total:
+                return None
+            return [(int(pos), int(end)) for pos, end in state['ranges']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_state(self, total):
+        """Record the open ranges (all connections have stopped)"""
+        state = {'url': self.url, 'total': total,
+                 'ranges': [[r.pos, r.end] for r in self._ranges if r.end > r.pos]}
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+        except OSError:
+            pass
+
+    def run(self, progress=None):
+        """Transfer the file (probe() first), resuming an interrupted
+        transfer; progress(done, total, speed) is called from this thread
+        about four times a second. Raises DownloadCanceled,
+        RangesUnsupported or the transfer error."""
+        total = self.total or self.probe()
+        if not total:
+            raise RangesUnsupported(self.url)
+        ranges = self._load_state(total)
+        if ranges is None:
+            with open(self.path, 'wb') as f:
+                f.truncate(total)  # preallocate: every range writes in place
+            step = -(-total // self.segments)
+            ranges = [(start, min(total, start + step)) for start in range(0, total, step)]
+        self._ranges = [_Range(pos, end) for pos, end in ranges if end > pos]
+        self.done = total - sum(r.end - r.pos for r in self._ranges)
+        # one connection per range; resumed ranges beyond that are picked up
+        # by connections that finish (see _steal)
+        starts = self._ranges[:self.segments]
+        for r in starts:
+            r.taken = True
+        threads = [threading.Thread(target=self._worker, args=(r,), daemon=True)
+                   for r in starts]
+        for t in threads:
+            t.start()
+        try:
+            self._wait(threads, total, progress)
+        finally:
+            if any(t.is_alive() for t in threads):
+                pass  # still writing: the saved state (if any) stays valid
+            elif any(r.end > r.pos for r in self._ranges):
+                self._save_state(total)
+            else:
+                try:
+                    os.remove(self.state_path)
+                except OSError:
+                    pass
+        if progress is not None:
+            progress(total, total, 0.0)
+        return total
+
+    def _wait(self, threads, total, progress):
+        """Wait for the connections, reporting progress; raises why they
+        stopped early"""
+        last_done, last_time = self.done, time.monotonic()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(0.25 / len(threads))
+            if progress is not None:
+                now = time.monotonic()
+                done = self.done
+                speed = (done - last_done) / (now - last_time) if now > last_time else 0.0
+                last_done, last_time = done, now
+                progress(done, total, speed)
+        if self.cancelled():
+            raise DownloadCanceled(self.url)
+        if self._error is not None:
+            raise self._error
+        if self.done < total:
+            raise IOError(f'incomplete transfer: {self.done} of {total} bytes')
+
+    def _steal(self):
+        """A new range for an idle connection: a resumed range nobody works
+        on, else the upper half of the largest open range; None when
+        nothing is worth splitting"""
+        with self._lock:
+            for rng in self._ranges:
+                if not rng.taken:
+                    rng.taken = True
+                    return rng
+            victim = max(self._ranges, key=lambda r: r.end - r.pos, default=None)
+            if victim is None or victim.end - victim.pos < 2 * MIN_SPLIT:
+                return None
+            mid = victim.pos + (victim.end - victim.pos) // 2
+            stolen = _Range(mid, victim.end)
+            stolen.taken = True
+            victim.end = mid
+            self._ranges.append(stolen)
+            return stolen
+
+    def _stopped(self):
+        return self._error is not None or self.cancelled()
+
+    def _worker(self, rng):
+        try:
+            with open(self.path, 'r+b') as f:
+                while rng is not None and not self._stopped():
+                    self._fetch(rng, f)
+                    if rng.pos >= rng.end:
+                        with self._lock:
+                            self._ranges.remove(rng)
+                        rng = self._steal()
+        except Exception as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+
+    def _fetch(self, rng, f):
+        """Fetch rng until done, retrying failed requests"""
+        failures = 0
+        while rng.pos < rng.end and not self._stopped():
+            end = rng.end
+            if self.chunk_size:
+                end = min(end, rng.pos + self.chunk_size)
+            try:
+                response = self._open(rng.pos, end)
+                try:
+                    if (getattr(response, 'status', None) or response.getcode()) != 206:
+                        raise RangesUnsupported(self.url)
+                    self._copy(response, rng, f)
+                finally:
+                    response.close()
+                failures = 0
+            except RangesUnsupported:
+                raise
+            except Exception:
+                failures += 1
+                if failures > RETRIES or self._stopped():
+                    raise
+                time.sleep(min(2 ** failures, 10))
+
+    def _copy(self, response, rng, f):
+        f.seek(rng.pos)
+        while not self._stopped():
+            while self.paused():
+                if self._stopped():
+                    return
+                time.sleep(0.5)
+            data = response.read(CHUNK)
+            if not data:
+                return
+            with self._lock:
+                # another connection may have taken over our tail
+                data = data[:max(0, rng.end - rng.pos)]
+                if not data:
+                    return
+                rng.pos += len(data)
+                self.done += len(data)
+            f.write(data)
+            if self.throttle is not None:
+                self.throttle(len(data))
+
+
+__all__ = ['SegmentedDownload', 'RangesUnsupported', 'DownloadCanceled']
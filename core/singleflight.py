@@ -0,0 +1,71 @@
+"""
+Single-flight: concurrent requests for the same key share one call.
+
+Used in front of metadata extraction, so the same video queued on the Video
+and the Audio tab (or pasted while its prefetch is still running) is
+extracted once - one set of requests against the site's rate limits - and
+the second job starts the moment the first extraction returns.
+"""
+import threading
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls per key (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn, cancelled=None):
+        """Run fn() for key, or wait for the call already running for it.
+        Returns (result, shared); shared is True when another caller's
+        result was reused. Its exception is re-raised in every waiter.
+        cancelled() is polled while waiting and aborts with RuntimeError."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self._wait(flight, cancelled)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def wait(self, key, cancelled=None):
+        """Block until the call running for key (if any) has finished.
+        Returns True if there was one to wait for."""
+        with self._lock:
+            flight = self._flights.get(key)
+        if flight is None:
+            return False
+        self._wait(flight, cancelled)
+        return True
+
+    @staticmethod
+    def _wait(flight, cancelled):
+        while not flight.done.wait(0.5):
+            if cancelled is not None and cancelled():
+                raise RuntimeError('Download canceled')
+
+
+__all__ = ['SingleFlight']
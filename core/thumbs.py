@@ -0,0 +1,328 @@
+"""
+Preview thumbnails - fetched on a small shared pool, never on a download's
+critical path, and cached on disk.
+
+A slow image CDN used to delay the media transfer itself (a blocking 15 s
+urlopen between extraction and download). Now a worker only submits the
+fetch; for sites with predictable preview URLs (YouTube: i.ytimg.com/vi/ID)
+the fetch starts before extraction has even finished.
+
+The disk cache (runtime/cache/thumbs) is content-addressed: refs/ maps a
+URL hash to the digest of its image, blobs/ holds each distinct image once.
+Blobs are evicted least-recently-used once the cache outgrows its size.
+"""
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from core.media_id import canonical
+from tools.net import urlopen
+
+_POOL_SIZE = 4
+_MAX_BYTES = 3 * 1024 * 1024
+_TIMEOUT = 15
+
+# Display sizes the variants are picked for: picker rows, card hover zoom
+PICKER_SIZE = (80, 45)
+CARD_SIZE = (320, 180)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ThumbnailCache:
+    """Content-addressed image cache on disk with size-based LRU
+    eviction (thread-safe)"""
+
+    def __init__(self, root, ttl, max_bytes):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes in blobs/, counted on first put
+
+    def _ref_path(self, url):
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'refs', name[:2], name)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def get(self, url):
+        """Cached image bytes for url, or None"""
+        ref = self._ref_path(url)
+        with self._lock:
+            try:
+                if os.path.getmtime(ref) + self.ttl < time.time():
+                    self._drop(ref)
+                    return None
+                with open(ref, 'r', encoding='ascii') as f:
+                    digest = f.read().strip()
+            except (OSError, ValueError):
+                return None
+            try:
+                blob = self._blob_path(digest)
+                with open(blob, 'rb') as f:
+                    data = f.read()
+                os.utime(blob)  # LRU: mark as recently used
+                return data or None
+            except (OSError, ValueError):
+                self._drop(ref)  # its blob was evicted
+                return None
+
+    def put(self, url, data):
+        """Store the image fetched from url (best-effort)"""
+        if not url or not data:
+            return
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            try:
+                blob = self._blob_path(digest)
+                if os.path.exists(blob):
+                    os.utime(blob)
+                else:
+                    self._write(blob, data)
+                    if self._size is not None:
+                        self._size += len(data)
+                self._write(self._ref_path(url), digest.encode('ascii'))
+                if self._size is None or self._size > self.max_bytes:
+                    self._evict()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _drop(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used blobs down to 3/4 of the size limit,
+        then the refs left dangling or expired (caller holds the lock)"""
+        blobs = []
+        total = 0
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'blobs')):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total > self.max_bytes:
+            blobs.sort()
+            target = self.max_bytes * 3 // 4
+            for _, size, path in blobs:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        self._size = total
+        self._prune_refs()
+
+    def _prune_refs(self):
+        """Remove refs whose blob is gone or whose TTL ran out"""
+        expired = time.time() - self.ttl
+        for dirpath, _, files in os.walk(os.path.join(self.root, 'refs')):
+            for name in files:
+                ref = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(ref) < expired:
+                        os.remove(ref)
+                        continue
+                    with open(ref, 'r', encoding='ascii') as f:
+                        digest = f.read().strip()
+                    if not os.path.exists(self._blob_path(digest)):
+                        os.remove(ref)
+                except (OSError, ValueError):
+                    continue
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """The process-wide thumbnail cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(config.THUMB_CACHE_DIR, config.THUMB_CACHE_TTL,
+                                    config.THUMB_CACHE_MAX_BYTES)
+        return _cache
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_POOL_SIZE,
+                                       thread_name_prefix='thumbs')
+        return _pool
+
+
+def fetch_bytes(url, timeout=_TIMEOUT, max_bytes=_MAX_BYTES):
+    """Image bytes for url from the disk cache or the network; None on any
+    failure"""
+    cache = get_thumbnail_cache()
+    data = cache.get(url)
+    if data:
+        return data
+    try:
+        with urlopen(url, timeout=timeout) as resp:
+            data = resp.read(max_bytes)
+    except Exception:
+        return None
+    if not data:
+        return None
+    data = bytes(data)
+    cache.put(url, data)
+    return data
+
+
+def fetch_async(url, callback):
+    """Fetch url on the shared pool; callback(bytes or None) runs on a pool
+    thread (emitting a Qt signal from there is fine)"""
+    def job():
+        data = fetch_bytes(url)
+        try:
+            callback(data)
+        except Exception:
+            pass
+    return _get_pool().submit(job)
+
+
+class PriorityFetcher:
+    """Bounded set of fetch threads serving the lowest priority value first.
+    Priorities can change while requests wait (e.g. rows scrolled into
+    view), and waiting requests can be cancelled. callback(key, bytes or
+    None) runs on a fetch thread."""
+
+    def __init__(self, callback, workers=6, timeout=8, max_bytes=1024 * 1024):
+        self.callback = callback
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        self._heap = []          # (priority, seq, key)
+        self._pending = {}       # key -> (priority, seq, url)
+        self._seq = itertools.count()
+        self._threads = []
+        self._closed = False
+
+    def submit(self, key, url, priority=0):
+        with self._cond:
+            if self._closed or not url:
+                return
+            entry = (priority, next(self._seq), url)
+            self._pending[key] = entry
+            heapq.heappush(self._heap, (entry[0], entry[1], key))
+            if len(self._threads) < min(self.workers, len(self._pending)):
+                t = threading.Thread(target=self._loop, name='thumbs-prio',
+                                     daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+
+    def set_priorities(self, priorities):
+        """priorities: {key: priority}; keys not listed keep theirs"""
+        with self._cond:
+            for key, priority in priorities.items():
+                entry = self._pending.get(key)
+                if entry is not None and entry[0] != priority:
+                    self._pending[key] = (priority, entry[1], entry[2])
+            self._heap = [(p, seq, key) for key, (p, seq, _)
+                          in self._pending.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, key):
+        """Drop a request that has not started yet"""
+        with self._cond:
+            self._pending.pop(key, None)
+
+    def close(self):
+        """Drop everything waiting; running fetches finish on their own"""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._heap = []
+            self._cond.notify_all()
+
+    def _next(self):
+        with self._cond:
+            while not self._closed:
+                while self._heap:
+                    priority, seq, key = heapq.heappop(self._heap)
+                    entry = self._pending.get(key)
+                    if entry is not None and entry[:2] == (priority, seq):
+                        del self._pending[key]
+                        return key, entry[2]
+                self._cond.wait()
+            return None
+
+    def _loop(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            key, url = job
+            data = fetch_bytes(url, timeout=self.timeout, max_bytes=self.max_bytes)
+            if self._closed:
+                return
+            try:
+                self.callback(key, data)
+            except Exception:
+                pass
+
+
+def pick_thumbnail(thumbnails, width, height):
+    """URL of the smallest thumbnail variant at least width x height, from
+    yt-dlp's 'thumbnails' list. Without size metadata falls back to the
+    largest known / most preferred variant; None for an empty list."""
+    thumbs = [t for t in thumbnails or []
+              if isinstance(t, dict) and t.get('url')]
+    if not thumbs:
+        return None
+    sized = [t for t in thumbs if t.get('width') and t.get('height')]
+    adequate = [t for t in sized
+                if t['width'] >= width and t['height'] >= height]
+    if adequate:
+        best = min(adequate, key=lambda t: t['width'] * t['height'])
+    elif sized:
+        best = max(sized, key=lambda t: t['width'] * t['height'])
+    else:
+        # yt-dlp sorts worst -> best; prefer an explicit preference
+        best = max(enumerate(thumbs),
+                   key=lambda it: (it[1].get('preference') or 0, it[0]))[1]
+    return best['url']
+
+
+def predict_thumbnail(url):
+    """Preview URL known from the page URL alone (no extraction), or None.
+    mqdefault is 320x180 - 16:9 and the size of the hover zoom."""
+    key = canonical(url)
+    if key is not None and key[0] == 'youtube':
+        return f'https://i.ytimg.com/vi/{key[1]}/mqdefault.jpg'
+    return None
+
+
+__all__ = ['ThumbnailCache', 'PriorityFetcher', 'get_thumbnail_cache', 'fetch_async',
+           'fetch_bytes', 'pick_thumbnail', 'predict_thumbnail']
@@ -1,6 +1,7 @@
-"""UI module - user interface components"""
-from .widgets import DownloadItemWidget, ShadowGroupBox
-from .dialogs import ToolInstallDialog
-from .main_window import YouTubeDownloader
-
-__all__ = ['DownloadItemWidget', 'ShadowGroupBox', 'ToolInstallDialog', 'YouTubeDownloader']
+"""UI module - user interface components"""
+from .download_list import DownloadListView
+from .widgets import ShadowGroupBox
+from .dialogs import ToolInstallDialog
+from .main_window import YouTubeDownloader
+
+__all__ = ['DownloadListView', 'ShadowGroupBox', 'ToolInstallDialog', 'YouTubeDownloader']
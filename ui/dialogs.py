@@ -5,11 +5,14 @@ import os
 
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QProgressBar, QTextEdit, QCheckBox, QLineEdit, QListWidget,
-    QListWidgetItem, QWidget, QSizePolicy
+    QProgressBar, QTextEdit, QCheckBox, QLineEdit, QListView,
+    QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication
 )
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import (
+    QObject, QTimer, pyqtSignal, Qt, QAbstractListModel, QModelIndex,
+    QSortFilterProxyModel, QPoint, QRect, QRectF, QSize
+)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath
 
 import config
 from tools.installer import ToolInstallThread
@@ -218,84 +221,186 @@ def _fmt_duration(seconds):
     return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
 
 
-class _ThumbFetchThread(QThread):
-    """Fetch playlist thumbnails one by one in the background"""
-    loaded = pyqtSignal(int, bytes)
+class _ThumbLoader(QObject):
+    """Fetch picker thumbnails in parallel, rows in view first (disk cache
+    first, see core.thumbs). Requests are keyed by thumbnail URL, which
+    stays valid while rows are inserted above."""
+    loaded = pyqtSignal(str, bytes)
 
-    def __init__(self, urls, parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.urls = urls
-        self._is_running = True
+        from core.thumbs import PriorityFetcher
+        self._fetcher = PriorityFetcher(self._on_fetched)
+
+    def _on_fetched(self, url, data):
+        # fetch thread; the queued signal delivers it on the GUI thread
+        if data:
+            self.loaded.emit(url, data)
+
+    def request(self, url, priority):
+        self._fetcher.submit(url, url, priority)
+
+    def prioritize(self, priorities):
+        self._fetcher.set_priorities(priorities)
+
+    def cancel(self, url):
+        self._fetcher.cancel(url)
 
     def stop(self):
-        self._is_running = False
-
-    def run(self):
-        from tools.net import urlopen
-        for index, url in enumerate(self.urls):
-            if not self._is_running:
-                return
-            if not url:
-                continue
-            try:
-                with urlopen(url, timeout=10) as resp:
-                    data = resp.read(1024 * 1024)
-                if data and self._is_running:
-                    self.loaded.emit(index, bytes(data))
-            except Exception:
-                continue
-
-
-class _VideoRow(QWidget):
-    """One row of the video picker: checkbox, thumbnail, title, duration"""
-
-    def __init__(self, item, parent=None):
+        self._fetcher.close()
+
+
+class _VideoListModel(QAbstractListModel):
+    """Probe items with a checked set: O(1) toggles and counts, and bulk
+    changes emit one dataChanged instead of a signal per row"""
+    ThumbRole = Qt.UserRole + 1
+    DurationRole = Qt.UserRole + 2
+
+    selection_changed = pyqtSignal()
+
+    def __init__(self, items, parent=None):
         super().__init__(parent)
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(6, 4, 6, 4)
-        layout.setSpacing(10)
-
-        self.check = QCheckBox()
-        layout.addWidget(self.check)
-
-        self.thumb = QLabel("🎬")
-        self.thumb.setFixedSize(80, 45)
-        self.thumb.setAlignment(Qt.AlignCenter)
-        self.thumb.setStyleSheet(
-            f"background-color: {config.COLOR_THUMB_BG}; border-radius: 6px; "
-            "font-size: 12pt;")
-        layout.addWidget(self.thumb)
-
-        text_col = QVBoxLayout()
-        text_col.setSpacing(2)
-        self.title_label = QLabel(item.get("title") or "")
-        self.title_label.setToolTip(item.get("title") or "")
-        self.title_label.setStyleSheet(
-            f"font-size: 9pt; font-weight: 600; color: {config.COLOR_TEXT}; "
-            "background: transparent;")
-        self.title_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
-        text_col.addWidget(self.title_label)
-        self.duration_label = QLabel("🕒 " + _fmt_duration(item.get("duration")))
-        self.duration_label.setStyleSheet(
-            f"font-size: 8pt; color: {config.COLOR_TEXT_MUTED}; background: transparent;")
-        text_col.addWidget(self.duration_label)
-        layout.addLayout(text_col, 1)
-
-    def set_thumb(self, data):
-        from ui.widgets import _rounded_pixmap
-        pm = QPixmap()
-        if data and pm.loadFromData(data):
-            self.thumb.setStyleSheet("background: transparent;")
-            self.thumb.setPixmap(_rounded_pixmap(pm, 80, 45, 6))
+        self.items = items
+        self.checked = set()  # row indexes
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return item.get("title") or ""
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if index.row() in self.checked else Qt.Unchecked
+        if role == self.ThumbRole:
+            return item.get("thumbnail", "")
+        if role == self.DurationRole:
+            return item.get("duration")
+        return None
+
+    def toggle(self, row):
+        if row in self.checked:
+            self.checked.discard(row)
+        else:
+            self.checked.add(row)
+        self.row_changed(row)
+        self.selection_changed.emit()
+
+    def set_rows(self, rows, mode):
+        """mode: True (check), False (uncheck) or None (invert)"""
+        rows = set(rows)
+        if mode is True:
+            self.checked |= rows
+        elif mode is False:
+            self.checked -= rows
+        else:
+            self.checked ^= rows
+        if self.items:
+            self.dataChanged.emit(self.index(0), self.index(len(self.items) - 1),
+                                  [Qt.CheckStateRole])
+        self.selection_changed.emit()
+
+    def row_changed(self, row):
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def append(self, items):
+        self.insert(len(self.items), items)
+
+    def insert(self, row, items):
+        if not items:
+            return
+        count = len(items)
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        self.items[row:row] = items
+        self.checked = {r + count if r >= row else r for r in self.checked}
+        self.endInsertRows()
+
+
+class _VideoRowDelegate(QStyledItemDelegate):
+    """Paints one picker row: checkbox, thumbnail, title, duration"""
+
+    HEIGHT = 53
+    THUMB_W = 80
+    THUMB_H = 45
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.HEIGHT)
+
+    def paint(self, painter, option, index):
+        from ui.widgets import cached_thumb
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = option.rect
+        if option.state & QStyle.State_MouseOver:
+            painter.fillRect(rect, QColor(config.COLOR_ITEM_BG))
+
+        check = QStyleOptionButton()
+        check.rect = QRect(rect.left() + 6, rect.top() + (rect.height() - 16) // 2, 16, 16)
+        check.state = QStyle.State_Enabled | (
+            QStyle.State_On if index.data(Qt.CheckStateRole) == Qt.Checked
+            else QStyle.State_Off)
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawPrimitive(QStyle.PE_IndicatorCheckBox, check, painter, option.widget)
+
+        thumb = QRect(check.rect.right() + 11, rect.top() + 4, self.THUMB_W, self.THUMB_H)
+        pm = cached_thumb(index.data(_VideoListModel.ThumbRole), self.THUMB_W, self.THUMB_H)
+        if pm is not None:
+            painter.drawPixmap(thumb.topLeft(), pm)
+        else:
+            path = QPainterPath()
+            path.addRoundedRect(QRectF(thumb), 6, 6)
+            painter.fillPath(path, QColor(config.COLOR_THUMB_BG))
+            font = QFont(option.font)
+            font.setPointSizeF(12)
+            painter.setFont(font)
+            painter.setPen(QColor(config.COLOR_TEXT))
+            painter.drawText(thumb, Qt.AlignCenter, "🎬")
+
+        left = thumb.right() + 11
+        width = max(0, rect.right() - 6 - left)
+        title_font = QFont(option.font)
+        title_font.setPointSizeF(9)
+        title_font.setWeight(QFont.DemiBold)
+        painter.setFont(title_font)
+        painter.setPen(QColor(config.COLOR_TEXT))
+        title = QFontMetrics(title_font).elidedText(
+            index.data(Qt.DisplayRole), Qt.ElideRight, width)
+        painter.drawText(QRect(left, rect.top() + 8, width, 18),
+                         Qt.AlignLeft | Qt.AlignVCenter, title)
+        small = QFont(option.font)
+        small.setPointSizeF(8)
+        painter.setFont(small)
+        painter.setPen(QColor(config.COLOR_TEXT_MUTED))
+        painter.drawText(QRect(left, rect.top() + 28, width, 16),
+                         Qt.AlignLeft | Qt.AlignVCenter,
+                         "🕒 " + _fmt_duration(index.data(_VideoListModel.DurationRole)))
+        painter.restore()
 
 
 class VideoSelectDialog(QDialog):
-    """Pick which videos of a channel/playlist to download"""
-
-    def __init__(self, items, parent=None, tr=None):
+    """Pick which videos of a channel/playlist to download.
+    Model/view: opening, filtering and select-all stay instant for channels
+    with tens of thousands of videos. With complete=False the list is still
+    streaming in: add_items() appends pages, more_requested asks for the
+    next one when the user scrolls near the end. "Mirror all new" accepts
+    with mirror=True: the caller downloads every listed video not in the
+    folder's download archive, selection aside."""
+    more_requested = pyqtSignal()
+
+    # thumbnails are requested for this many rows around the viewport
+    THUMB_MARGIN = 40
+
+    def __init__(self, items, parent=None, tr=None, complete=True):
         super().__init__(parent)
         self._tr = tr or (lambda s: s)
-        self.items = items
+        self.items = list(items)
+        self._complete = complete
+        self._more_pending = False  # asked for a page that has not come yet
+        self._head_count = 0        # new entries inserted above cached ones
+        self.mirror = False         # accepted via "Mirror all new"
         self.setWindowTitle(self._tr("Select videos to download"))
         self.setModal(True)
         self.resize(660, 580)
@@ -308,22 +413,24 @@ class VideoSelectDialog(QDialog):
         self.search_input.textChanged.connect(self._apply_filter)
         layout.addWidget(self.search_input)
 
-        self.list = QListWidget()
+        self.model = _VideoListModel(self.items, self)
+        self.model.selection_changed.connect(self._update_count)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.list = QListView()
+        self.list.setModel(self.proxy)
+        self.list.setItemDelegate(_VideoRowDelegate(self.list))
+        self.list.setUniformItemSizes(True)
         self.list.setSpacing(2)
-        self.list.setStyleSheet("QListWidget::item:selected { background: transparent; }")
-        self.list.itemClicked.connect(self._toggle_row)
+        self.list.setMouseTracking(True)
+        self.list.setSelectionMode(QListView.NoSelection)
+        self.list.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.list.clicked.connect(
+            lambda index: self.model.toggle(self.proxy.mapToSource(index).row()))
         layout.addWidget(self.list, 1)
 
-        self.rows = []
-        for item in self.items:
-            row = _VideoRow(item)
-            row.check.stateChanged.connect(self._update_count)
-            list_item = QListWidgetItem()
-            list_item.setSizeHint(row.sizeHint())
-            self.list.addItem(list_item)
-            self.list.setItemWidget(list_item, row)
-            self.rows.append(row)
-
         controls = QHBoxLayout()
         controls.setSpacing(8)
         self.select_all_btn = QPushButton("✅ " + self._tr("Select all"))
@@ -343,6 +450,9 @@ class VideoSelectDialog(QDialog):
         layout.addLayout(controls)
 
         buttons = QHBoxLayout()
+        self.mirror_btn = QPushButton("🪞 " + self._tr("Mirror all new"))
+        self.mirror_btn.clicked.connect(self._accept_mirror)
+        buttons.addWidget(self.mirror_btn)
         buttons.addStretch()
         self.download_btn = QPushButton("⬇ " + self._tr("Download selected"))
         self.download_btn.setStyleSheet(config.STYLESHEET_BUTTON_PRIMARY)
@@ -355,50 +465,144 @@ class VideoSelectDialog(QDialog):
 
         self._update_count()
 
-        # fetch thumbnails in the background
-        self._thumbs = _ThumbFetchThread([i.get("thumbnail", "") for i in self.items])
+        # Thumbnails load in the background for the rows around the
+        # viewport only, those in view first; re-prioritized on scroll
+        self._thumbs = _ThumbLoader(self)
         self._thumbs.loaded.connect(self._on_thumb)
-        self._thumbs.start()
+        self._thumb_pending = set()  # thumbnail URLs requested, not loaded yet
+        self._prioritize_timer = QTimer(self)
+        self._prioritize_timer.setSingleShot(True)
+        self._prioritize_timer.setInterval(50)
+        self._prioritize_timer.timeout.connect(self._prioritize_thumbs)
+        self.list.verticalScrollBar().valueChanged.connect(
+            self._prioritize_timer.start)
+        self.list.verticalScrollBar().valueChanged.connect(self._maybe_request_more)
+        QTimer.singleShot(0, self._prioritize_thumbs)  # once laid out
+
+    def add_items(self, items):
+        """Next page of a streaming listing"""
+        self.model.append(items)
+        self._more_pending = False
+        self._update_count()
+        self._prioritize_timer.start()
+        self._maybe_request_more()
+
+    def insert_new_items(self, items):
+        """Entries newer than the cached listing shown so far: they go on
+        top, after the ones inserted before (stale-while-revalidate)"""
+        self.model.insert(self._head_count, items)
+        self._head_count += len(items)
+        self._update_count()
+        self._prioritize_timer.start()
 
-    def _on_thumb(self, index, data):
-        if 0 <= index < len(self.rows):
-            self.rows[index].set_thumb(data)
+    def set_complete(self):
+        """The listing has no more pages"""
+        self._complete = True
+        self._update_count()
 
-    def _toggle_row(self, list_item):
-        row = self.list.itemWidget(list_item)
-        if row is not None:
-            row.check.setChecked(not row.check.isChecked())
+    def is_complete(self):
+        return self._complete
+
+    def _maybe_request_more(self):
+        """Ask for the next page once the view is within a screen of the end
+        (also when a search leaves too few rows to scroll at all)"""
+        if self._complete or self._more_pending:
+            return
+        bar = self.list.verticalScrollBar()
+        if bar.maximum() - bar.value() <= self.list.viewport().height():
+            self._more_pending = True
+            self.more_requested.emit()
+
+    def _on_thumb(self, url, data):
+        from ui.widgets import load_thumb
+        self._thumb_pending.discard(url)
+        load_thumb(url, data, 80, 45, 6,
+                   lambda _pm: self.list.viewport().update())
+
+    def _visible_rows(self):
+        """(first, last) proxy row in the viewport; (0, -1) when empty.
+        Probes the middle of the first and last item: at x=0 and the very
+        edges they hit the spacing between items. A missed probe is
+        estimated from the scroll position, never widened to every row."""
+        count = self.proxy.rowCount()
+        if not count:
+            return 0, -1
+        viewport = self.list.viewport()
+        spacing = self.list.spacing()
+        x = viewport.width() // 2
+        top = self.list.indexAt(QPoint(x, spacing + 1))
+        bottom = self.list.indexAt(QPoint(x, viewport.height() - spacing - 1))
+        row_height = max(1, self.list.sizeHintForRow(0) + 2 * spacing)
+        page = viewport.height() // row_height + 1
+        if top.isValid():
+            first = top.row()
+        else:
+            first = min(count - 1, self.list.verticalScrollBar().value() // row_height)
+        last = bottom.row() if bottom.isValid() else first + page
+        return first, min(count - 1, max(first, last))
+
+    def _prioritize_thumbs(self):
+        """Request missing previews near the viewport; rows in view fetch
+        first, then by distance from it"""
+        from ui.widgets import cached_thumb
+        first, last = self._visible_rows()
+        if last < first:
+            return
+        lo = max(0, first - self.THUMB_MARGIN)
+        hi = min(self.proxy.rowCount() - 1, last + self.THUMB_MARGIN)
+        priorities = {}
+        for proxy_row in range(lo, hi + 1):
+            row = self.proxy.mapToSource(self.proxy.index(proxy_row, 0)).row()
+            url = self.items[row].get("thumbnail", "")
+            priority = 0 if first <= proxy_row <= last else (
+                min(abs(proxy_row - first), abs(proxy_row - last)))
+            if url in self._thumb_pending:
+                priorities[url] = min(priority, priorities.get(url, priority))
+            elif url and cached_thumb(url, 80, 45) is None:
+                self._thumb_pending.add(url)
+                self._thumbs.request(url, priority)
+                priorities[url] = priority
+        # requests that scrolled out of range are dropped; scrolling back
+        # requests them again
+        for url in [u for u in self._thumb_pending if u not in priorities]:
+            self._thumb_pending.discard(url)
+            self._thumbs.cancel(url)
+        self._thumbs.prioritize(priorities)
+
+    def _visible_source_rows(self):
+        """Source rows that pass the search filter"""
+        if not self.proxy.filterRegExp().pattern():
+            return range(len(self.items))
+        return [self.proxy.mapToSource(self.proxy.index(i, 0)).row()
+                for i in range(self.proxy.rowCount())]
 
     def _set_all(self, checked):
-        for i, row in enumerate(self.rows):
-            if not self.list.isRowHidden(i):
-                row.check.setChecked(checked)
+        self.model.set_rows(self._visible_source_rows(), checked)
 
     def _invert(self):
-        for i, row in enumerate(self.rows):
-            if not self.list.isRowHidden(i):
-                row.check.setChecked(not row.check.isChecked())
+        self.model.set_rows(self._visible_source_rows(), None)
 
     def _apply_filter(self, text):
-        needle = text.strip().lower()
-        for i, item in enumerate(self.items):
-            hidden = bool(needle) and needle not in (item.get("title") or "").lower()
-            self.list.setRowHidden(i, hidden)
+        self.proxy.setFilterFixedString(text.strip())
+        self._prioritize_timer.start()
+        self._maybe_request_more()
 
     def _update_count(self):
-        selected = sum(1 for r in self.rows if r.check.isChecked())
-        self.count_label.setText(
-            f'{self._tr("Selected:")} {selected} / {len(self.rows)}')
+        selected = len(self.model.checked)
+        total = f"{len(self.items)}" if self._complete else f"{len(self.items)}+"
+        self.count_label.setText(f'{self._tr("Selected:")} {selected} / {total}')
         self.download_btn.setEnabled(selected > 0)
 
     def selected_items(self):
-        return [item for item, row in zip(self.items, self.rows)
-                if row.check.isChecked()]
+        return [self.items[i] for i in sorted(self.model.checked)]
 
     def _shutdown(self):
-        if self._thumbs.isRunning():
-            self._thumbs.stop()
-            self._thumbs.wait(3000)
+        self._prioritize_timer.stop()
+        self._thumbs.stop()
+
+    def _accept_mirror(self):
+        self.mirror = True
+        self.accept()
 
     def accept(self):
         self._shutdown()
@@ -0,0 +1,434 @@
+"""
+Download lists - model/view replacement for per-job card widgets.
+
+Each job is a small DownloadEntry record in a DownloadListModel; the
+DownloadItemDelegate paints the card (thumbnail, title, status, progress,
+stats, buttons) and hit-tests its buttons, so no widgets exist per row and
+a queue of thousands of jobs costs a few hundred bytes per job.
+"""
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QLabel
+from PyQt5.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize, QEvent,
+    QPoint, pyqtSignal
+)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath
+
+import config
+from ui.widgets import _fmt_eta, _fmt_size, _fmt_speed, cached_thumb, load_thumb
+
+# state -> (icon, status text, color kind)
+_STATUS = {
+    'queued': ("⏳", "Queued", "accent"),
+    'downloading': ("▶", "Downloading", "accent"),
+    'paused': ("⏸", "Paused", "accent"),
+    'converting': ("🔄", "Converting", "accent"),
+    'completed': ("✅", "Completed", "green"),
+    'canceled': ("⚠️", "Canceled", "red"),
+    'error': ("❌", "Error", "red"),
+}
+FINISHED_STATES = ('completed', 'canceled', 'error')
+
+
+class DownloadEntry:
+    """Display state of one job (one row)"""
+    __slots__ = ('dl_id', 'media_type', 'title', 'state', 'percent',
+                 'downloaded', 'total', 'speed', 'eta', 'has_progress',
+                 'thumb_url', 'thumb_data', 'thumb_pending')
+
+    def __init__(self, dl_id, media_type, title, state='queued'):
+        self.dl_id = dl_id
+        self.media_type = media_type
+        self.title = title
+        self.state = state
+        self.percent = 0.0
+        self.downloaded = self.total = self.speed = self.eta = -1
+        self.has_progress = False
+        self.thumb_url = ""
+        self.thumb_data = None   # raw bytes; pixmaps live in the shared cache
+        self.thumb_pending = False
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+
+class DownloadListModel(QAbstractListModel):
+    """Rows of DownloadEntry, addressable by dl_id in O(1)"""
+    EntryRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+        self._rows = {}  # dl_id -> row
+
+    # ------------------------------------------------------- Qt interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return entry.title
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    # ---------------------------------------------------------------- API
+
+    def add(self, entry):
+        row = len(self._entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.append(entry)
+        self._rows[entry.dl_id] = row
+        self.endInsertRows()
+
+    def entry(self, dl_id):
+        row = self._rows.get(dl_id)
+        return None if row is None else self._entries[row]
+
+    def index_of(self, dl_id):
+        row = self._rows.get(dl_id)
+        return QModelIndex() if row is None else self.index(row)
+
+    def entries(self):
+        return list(self._entries)
+
+    def update(self, dl_id, **fields):
+        """Change display fields of one row and repaint just that row"""
+        row = self._rows.get(dl_id)
+        if row is None:
+            return
+        entry = self._entries[row]
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def set_progress(self, dl_id, percent, downloaded, total, speed, eta):
+        """Raw numbers from the worker (-1 = unknown)"""
+        entry = self.entry(dl_id)
+        if entry is None:
+            return
+        if percent >= 0:
+            entry.percent = percent
+        self.update(dl_id, downloaded=downloaded, total=total, speed=speed,
+                    eta=eta, has_progress=True)
+
+    def set_thumbnail(self, dl_id, url, data):
+        if data:
+            self.update(dl_id, thumb_url=url, thumb_data=data, thumb_pending=False)
+
+    def thumbnail_ready(self, entry):
+        """A decode requested while painting entry finished"""
+        entry.thumb_pending = False
+        self.update(entry.dl_id)
+
+    def remove(self, dl_id):
+        row = self._rows.get(dl_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._entries[row]
+        del self._rows[dl_id]
+        for i in range(row, len(self._entries)):
+            self._rows[self._entries[i].dl_id] = i
+        self.endRemoveRows()
+
+    def remove_finished(self):
+        """Drop all completed/canceled/failed rows in one pass"""
+        keep = [e for e in self._entries if not e.finished]
+        if len(keep) == len(self._entries):
+            return
+        self.beginResetModel()
+        self._entries = keep
+        self._rows = {e.dl_id: i for i, e in enumerate(keep)}
+        self.endResetModel()
+
+    def refresh(self):
+        """Repaint every row (theme or language changed)"""
+        if self._entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self._entries) - 1))
+
+
+class DownloadItemDelegate(QStyledItemDelegate):
+    """Paints a download card and turns clicks on its buttons into
+    button_clicked(dl_id, 'top' | 'pause' | 'cancel' | 'remove')"""
+    button_clicked = pyqtSignal(str, str)
+
+    THUMB_W = 96
+    THUMB_H = 54
+    HEIGHT = 78     # card height
+    GAP = 10        # space between cards
+
+    def __init__(self, parent=None, tr=None):
+        super().__init__(parent)
+        self._tr = tr or (lambda s: s)
+        self._hover = None  # (dl_id, button name) under the mouse
+
+    # ---------------------------------------------------------- geometry
+
+    def card_rect(self, rect):
+        return QRect(rect.left() + 2, rect.top() + self.GAP // 2,
+                     rect.width() - 4, self.HEIGHT)
+
+    def thumb_rect(self, rect):
+        card = self.card_rect(rect)
+        return QRect(card.left() + 10, card.top() + (self.HEIGHT - self.THUMB_H) // 2,
+                     self.THUMB_W, self.THUMB_H)
+
+    def _fonts(self, base):
+        title = QFont(base)
+        title.setPointSizeF(9)
+        title.setWeight(QFont.DemiBold)
+        small = QFont(base)
+        small.setPointSizeF(8)
+        status = QFont(small)
+        status.setWeight(QFont.DemiBold)
+        button = QFont(title)
+        return title, small, status, button
+
+    def _buttons(self, rect, entry, font):
+        """[(name, QRect, text)] right-aligned in the stats row"""
+        if entry.finished:
+            specs = [('remove', "🗑 " + self._tr("Remove from list"))]
+        else:
+            specs = []
+            if entry.state == 'queued':
+                specs.append(('top', "⏫ " + self._tr("Move to top")))
+            else:
+                specs.append(('pause', "▶ " + self._tr("Resume")
+                              if entry.state == 'paused'
+                              else "⏸ " + self._tr("Pause")))
+            specs.append(('cancel', "✕ " + self._tr("Cancel")))
+        card = self.card_rect(rect)
+        metrics = QFontMetrics(font)
+        right = card.right() - 10
+        top = card.top() + 8 + 36
+        out = []
+        for name, text in reversed(specs):
+            width = metrics.horizontalAdvance(text) + 28
+            out.append((name, QRect(right - width + 1, top, width, 26), text))
+            right -= width + 6
+        out.reverse()
+        return out
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.HEIGHT + self.GAP)
+
+    # ------------------------------------------------------------- paint
+
+    def paint(self, painter, option, index):
+        entry = index.data(DownloadListModel.EntryRole)
+        if entry is None:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        title_font, small_font, status_font, button_font = self._fonts(option.font)
+
+        card = self.card_rect(option.rect)
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(card).adjusted(0.5, 0.5, -0.5, -0.5), 10, 10)
+        painter.fillPath(path, QColor(config.COLOR_ITEM_BG))
+        painter.setPen(QColor(config.COLOR_CARD_BORDER))
+        painter.drawPath(path)
+
+        self._paint_thumb(painter, index, entry, self.thumb_rect(option.rect))
+
+        left = card.left() + 10 + self.THUMB_W + 12
+        right = card.right() - 10
+        top = card.top() + 8
+
+        # status on the right of the title row
+        icon, text, kind = _STATUS[entry.state]
+        color = {"accent": config.COLOR_BTN_TEXT, "green": config.COLOR_GREEN,
+                 "red": config.COLOR_RED}[kind]
+        status = f"{icon} {self._tr(text)}"
+        painter.setFont(status_font)
+        status_w = QFontMetrics(status_font).horizontalAdvance(status)
+        painter.setPen(QColor(color))
+        painter.drawText(QRect(right - status_w, top, status_w, 18),
+                         Qt.AlignRight | Qt.AlignVCenter, status)
+
+        # title, elided instead of stretching the list horizontally
+        title_color = {"green": config.COLOR_GREEN, "red": config.COLOR_RED}.get(
+            kind if entry.finished else "", config.COLOR_TEXT)
+        painter.setFont(title_font)
+        painter.setPen(QColor(title_color))
+        title_w = max(0, right - status_w - 8 - left)
+        painter.drawText(QRect(left, top, title_w, 18), Qt.AlignLeft | Qt.AlignVCenter,
+                         QFontMetrics(title_font).elidedText(entry.title, Qt.ElideRight, title_w))
+
+        # progress bar
+        bar = QRectF(left, top + 24, right - left, 8)
+        track = QPainterPath()
+        track.addRoundedRect(bar, 4, 4)
+        painter.fillPath(track, QColor(config.COLOR_TRACK))
+        percent = 100 if entry.state == 'completed' else max(0, min(100, entry.percent))
+        if percent > 0:
+            chunk = QPainterPath()
+            chunk.addRoundedRect(QRectF(bar.left(), bar.top(),
+                                        max(8.0, bar.width() * percent / 100), bar.height()), 4, 4)
+            painter.fillPath(chunk, QColor(config.COLOR_PRIMARY))
+
+        # stats: speed / size / time
+        painter.setFont(small_font)
+        painter.setPen(QColor(config.COLOR_TEXT_MUTED))
+        stats_top = top + 36
+        for x, width, text in zip((left, left + 98, left + 230), (84, 118, 58),
+                                  self._stats(entry)):
+            painter.drawText(QRect(x, stats_top, width + 14, 26),
+                             Qt.AlignLeft | Qt.AlignVCenter, text)
+
+        # buttons
+        painter.setFont(button_font)
+        for name, rect, text in self._buttons(option.rect, entry, button_font):
+            hovered = self._hover == (entry.dl_id, name)
+            if name == 'top' or (name == 'pause' and entry.state != 'paused'):
+                bg = config.COLOR_BTN_BG_HOVER if hovered else config.COLOR_BTN_BG
+                fg = config.COLOR_BTN_TEXT
+            elif name == 'pause':
+                bg = config.COLOR_CHIP_GREEN_BG_HOVER if hovered else config.COLOR_CHIP_GREEN_BG
+                fg = config.COLOR_CHIP_GREEN_TEXT
+            else:
+                bg = config.COLOR_CHIP_RED_BG_HOVER if hovered else config.COLOR_CHIP_RED_BG
+                fg = config.COLOR_CHIP_RED_TEXT
+            chip = QPainterPath()
+            chip.addRoundedRect(QRectF(rect), 7, 7)
+            painter.fillPath(chip, QColor(bg))
+            painter.setPen(QColor(fg))
+            painter.drawText(rect, Qt.AlignCenter, text)
+
+        painter.restore()
+
+    def _stats(self, entry):
+        if not entry.has_progress:
+            return "⚡ —", "💾 —", "🕒 —"
+        if entry.total > 0 and entry.downloaded >= 0:
+            size = f"{_fmt_size(entry.downloaded)}/{_fmt_size(entry.total)}"
+        elif entry.downloaded >= 0:
+            size = _fmt_size(entry.downloaded)
+        else:
+            size = "?"
+        return (f"⏱ {_fmt_speed(entry.speed)}", f"📦 {size}",
+                f"⏳ {_fmt_eta(entry.eta)}")
+
+    def _paint_thumb(self, painter, index, entry, rect):
+        pm = cached_thumb(entry.thumb_url, self.THUMB_W, self.THUMB_H)
+        if pm is None and entry.thumb_data and not entry.thumb_pending:
+            # decoded off the GUI thread; evicted pixmaps are rebuilt here
+            entry.thumb_pending = True
+            model = index.model()
+            load_thumb(entry.thumb_url, entry.thumb_data, self.THUMB_W,
+                       self.THUMB_H, 8, lambda _pm, e=entry: model.thumbnail_ready(e))
+        if pm is not None:
+            painter.drawPixmap(rect.topLeft(), pm)
+            return
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(rect), 8, 8)
+        painter.fillPath(path, QColor(config.COLOR_THUMB_BG))
+        font = QFont(painter.font())
+        font.setPointSizeF(15)
+        painter.setFont(font)
+        painter.setPen(QColor(config.COLOR_TEXT))
+        painter.drawText(rect, Qt.AlignCenter,
+                         "🎬" if entry.media_type == "Video" else "🎧")
+
+    # ------------------------------------------------------------- input
+
+    def editorEvent(self, event, model, option, index):
+        entry = index.data(DownloadListModel.EntryRole)
+        if entry is None or event.type() not in (
+                QEvent.MouseMove, QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return False
+        hit = None
+        _, _, _, button_font = self._fonts(option.font)
+        for name, rect, _ in self._buttons(option.rect, entry, button_font):
+            if rect.contains(event.pos()):
+                hit = name
+                break
+        hover = (entry.dl_id, hit) if hit else None
+        if hover != self._hover:
+            if self._hover is not None:
+                model.update(self._hover[0])
+            self._hover = hover
+            model.update(entry.dl_id)
+        if hit is None:
+            return False
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            self.button_clicked.emit(entry.dl_id, hit)
+        return True
+
+    def clear_hover(self, model):
+        if self._hover is not None:
+            dl_id, self._hover = self._hover[0], None
+            model.update(dl_id)
+
+
+class DownloadListView(QListView):
+    """List of download cards; shows the enlarged thumbnail on hover"""
+
+    def __init__(self, model, parent=None, tr=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.delegate = DownloadItemDelegate(self, tr=tr)
+        self.setItemDelegate(self.delegate)
+        self.setUniformItemSizes(True)   # no per-row size queries
+        self.setMouseTracking(True)
+        self.setSelectionMode(QListView.NoSelection)
+        self.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setStyleSheet("QListView { background: transparent; border: none; }")
+        self._zoom_popup = None
+        self._zoom_id = None  # dl_id whose zoom is wanted
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        index = self.indexAt(event.pos())
+        entry = index.data(DownloadListModel.EntryRole) if index.isValid() else None
+        if (entry is not None and entry.thumb_data
+                and self.delegate.thumb_rect(self.visualRect(index)).contains(event.pos())):
+            if self._zoom_id != entry.dl_id:
+                self._zoom_id = entry.dl_id
+                # built on first hover only; most cards are never hovered
+                load_thumb(entry.thumb_url, entry.thumb_data, 320, 180, 12,
+                           lambda pm, d=entry.dl_id: self._show_zoom(d, pm))
+        else:
+            self._hide_zoom()
+
+    def leaveEvent(self, event):
+        self._hide_zoom()
+        self.delegate.clear_hover(self.model())
+        super().leaveEvent(event)
+
+    def hideEvent(self, event):
+        self._hide_zoom()
+        super().hideEvent(event)
+
+    def _show_zoom(self, dl_id, pm):
+        index = self.model().index_of(dl_id)
+        if self._zoom_id != dl_id or not index.isValid():
+            return  # decoded after the pointer already left
+        if self._zoom_popup is None:
+            self._zoom_popup = QLabel(None, Qt.ToolTip | Qt.FramelessWindowHint)
+            self._zoom_popup.setAttribute(Qt.WA_TranslucentBackground)
+            self._zoom_popup.setStyleSheet("background: transparent;")
+            # popup has no parent: tie its lifetime to this view
+            self.destroyed.connect(self._zoom_popup.deleteLater)
+        thumb = self.delegate.thumb_rect(self.visualRect(index))
+        self._zoom_popup.setPixmap(pm)
+        self._zoom_popup.resize(pm.size())
+        self._zoom_popup.move(self.viewport().mapToGlobal(
+            QPoint(thumb.right() + 10, thumb.top() - 62)))
+        self._zoom_popup.show()
+
+    def _hide_zoom(self):
+        self._zoom_id = None
+        if self._zoom_popup is not None:
+            self._zoom_popup.hide()
+
+
+__all__ = ['DownloadEntry', 'DownloadListModel', 'DownloadItemDelegate',
+           'DownloadListView', 'FINISHED_STATES']
@@ -3,25 +3,36 @@ Main Window - YouTubeDownloader application main window
 """
 import os
 import sys
+import copy
+import collections
 import json
 import time
 import subprocess
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QLabel, QLineEdit, QPushButton, QComboBox, QMessageBox, QFileDialog,
-    QTabWidget, QListWidget, QListWidgetItem, QCheckBox, QApplication,
+    QTabWidget, QCheckBox, QApplication,
     QTextEdit, QSlider, QGroupBox, QScrollArea, QFrame, QSpinBox,
-    QColorDialog, QProgressDialog
+    QDoubleSpinBox, QColorDialog, QProgressDialog
 )
 from PyQt5.QtCore import Qt, QSettings, QTimer, QObject, pyqtSignal, QUrl, QEvent
 from PyQt5.QtGui import QFont, QIcon, QTextCursor, QColor, QDesktopServices
 
 import config
 from config import APP_TITLE
-from core.downloader import DownloadWorker, PlaylistProbeWorker
+from core.downloader import (BOT_CHECK_MARKER, DownloadWorker,
+                             MetadataPrefetchWorker, PlaylistProbeWorker)
+from core.adaptive import AdaptiveLimit
+from core.archive import get_archive
+from core.bandwidth import BandwidthSchedule, get_limiter
+from core.history import get_history, media_id
+from core.jobs import (BANDWIDTH_WEIGHTS, Job, JobStore, PRIORITY_HIGH,
+                       PRIORITY_NORMAL)
+from core.listcache import get_listing_cache
+from core.media_id import canonical, is_collection, media_key, site
 from core.tools import check_and_install_tools
-from ui.widgets import (DownloadItemWidget, ShadowGroupBox, BannerWidget,
-                        CollapsibleBox)
+from ui.download_list import DownloadEntry, DownloadListModel, DownloadListView
+from ui.widgets import ShadowGroupBox, BannerWidget, CollapsibleBox
 
 
 class EmittingStream(QObject):
@@ -153,20 +164,29 @@ class YouTubeDownloader(QMainWindow):
 
         self.video_workers = {}
         self.audio_workers = {}
-        self.video_items = {}
-        self.audio_items = {}
         self._zombie_workers = set()  # retired but possibly still-running threads
         self._download_seq = 0
-        self._queue = []              # jobs waiting for a free download slot
+        # queued and running downloads
+        self._jobs = JobStore(site_limit=config.SITE_MAX_CONCURRENT.get)
+        self._batch_seq = 0
         self._probe = None            # playlist/channel probe thread
         self._probe_dialog = None
-        # Completed downloads history: "media|url" -> {"file": path, "count": n}
-        try:
-            self._history = json.loads(self.settings.value("download_history", "{}"))
-            if not isinstance(self._history, dict):
-                self._history = {}
-        except Exception:
-            self._history = {}
+        self._probe_picker = None     # VideoSelectDialog filled by the probe
+        self._mirrors = []            # running channel mirrors (see _start_mirror)
+        self._mirror_probes = set()   # their probe threads, until finished
+        self._feeding = False
+        # Speculative extraction of the link in the Link field
+        self._prefetch = None         # running MetadataPrefetchWorker
+        self._prefetch_pending = None  # URL to prefetch once it finishes
+        self._prefetched = None       # (url, cookie params, info dict)
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(700)  # debounce typing
+        self._prefetch_timer.timeout.connect(self._start_prefetch)
+        self.url_input.textChanged.connect(self._on_url_changed)
+        # Completed downloads history (SQLite, see core.history)
+        self._history = get_history()
+        self._migrate_history()
         self._restore_preferences()
 
         # All external tools (ffmpeg, deno, yt-dlp) live in the runtime folder
@@ -242,11 +262,27 @@ class YouTubeDownloader(QMainWindow):
     def _workers(self, media_type):
         return self.video_workers if media_type == "Video" else self.audio_workers
 
-    def _items(self, media_type):
-        return self.video_items if media_type == "Video" else self.audio_items
-
-    def _downloads_list(self, media_type):
-        return self.video_downloads_list if media_type == "Video" else self.audio_downloads_list
+    def _model(self, media_type):
+        return self.video_model if media_type == "Video" else self.audio_model
+
+    def _make_downloads_list(self, media_type):
+        """Model-backed card list; card buttons report back by dl_id"""
+        model = DownloadListModel(self)
+        view = DownloadListView(model, tr=self.tr)
+        view.setMinimumHeight(150)
+        view.delegate.button_clicked.connect(
+            lambda dl_id, button: self._on_card_button(dl_id, media_type, button))
+        return model, view
+
+    def _on_card_button(self, dl_id, media_type, button):
+        if button == 'pause':
+            self.pause_download(dl_id, media_type)
+        elif button == 'cancel':
+            self.cancel_download(dl_id, media_type)
+        elif button == 'top':
+            self.move_to_top(dl_id, media_type)
+        elif button == 'remove':
+            self.remove_download(dl_id, media_type)
 
     def _field_column(self, label, widget):
         """Small caption above its control - used for the one-line settings row"""
@@ -317,9 +353,7 @@ class YouTubeDownloader(QMainWindow):
         self.video_downloads_group = ShadowGroupBox(self.tr("Active Downloads"))
         video_downloads_layout = QVBoxLayout(self.video_downloads_group)
 
-        self.video_downloads_list = QListWidget()
-        self.video_downloads_list.setSpacing(10)
-        self.video_downloads_list.setMinimumHeight(150)
+        self.video_model, self.video_downloads_list = self._make_downloads_list("Video")
         video_downloads_layout.addWidget(self.video_downloads_list)
 
         clear_completed_layout = QHBoxLayout()
@@ -373,9 +407,7 @@ class YouTubeDownloader(QMainWindow):
         self.audio_downloads_group = ShadowGroupBox(self.tr("Active Downloads"))
         audio_downloads_layout = QVBoxLayout(self.audio_downloads_group)
 
-        self.audio_downloads_list = QListWidget()
-        self.audio_downloads_list.setSpacing(10)
-        self.audio_downloads_list.setMinimumHeight(150)
+        self.audio_model, self.audio_downloads_list = self._make_downloads_list("Audio")
         audio_downloads_layout.addWidget(self.audio_downloads_list)
 
         clear_completed_layout = QHBoxLayout()
@@ -459,7 +491,8 @@ class YouTubeDownloader(QMainWindow):
         self.dir_group.setContentLayout(dir_layout)
         settings_layout.addWidget(self.dir_group)
 
-        # Download queue: sequential or parallel with a limit
+        # Download queue: sequential, parallel with a limit, or adaptive
+        # between a minimum and that limit
         self.downloads_group = self._make_section("downloads", self.tr("Downloads"))
         dlmode_layout = QHBoxLayout()
         dlmode_layout.setContentsMargins(6, 4, 6, 4)
@@ -470,6 +503,7 @@ class YouTubeDownloader(QMainWindow):
         self.dlmode_combo = QComboBox()
         self.dlmode_combo.addItem(self.tr("Sequential (one by one)"), "sequential")
         self.dlmode_combo.addItem(self.tr("Parallel"), "parallel")
+        self.dlmode_combo.addItem(self.tr("Adaptive"), "adaptive")
         mode_idx = self.dlmode_combo.findData(
             self.settings.value("download_mode", "parallel"))
         if mode_idx >= 0:
@@ -480,17 +514,76 @@ class YouTubeDownloader(QMainWindow):
         self.parallel_label = QLabel(self.tr("Parallel downloads:"))
         dlmode_layout.addWidget(self.parallel_label)
         self.parallel_spin = QSpinBox()
-        self.parallel_spin.setRange(2, 10)
+        self.parallel_spin.setRange(2, 16)  # per-site caps: config.SITE_MAX_CONCURRENT
         self.parallel_spin.setValue(
             self.settings.value("parallel_limit", 3, type=int))
         self.parallel_spin.valueChanged.connect(self._on_parallel_limit_changed)
         dlmode_layout.addWidget(self.parallel_spin)
+        self.adaptive_min_label = QLabel(self.tr("Minimum:"))
+        dlmode_layout.addWidget(self.adaptive_min_label)
+        self.adaptive_min_spin = QSpinBox()
+        self.adaptive_min_spin.setRange(1, 16)
+        self.adaptive_min_spin.setValue(
+            self.settings.value("adaptive_min", 2, type=int))
+        self.adaptive_min_spin.valueChanged.connect(self._on_parallel_limit_changed)
+        dlmode_layout.addWidget(self.adaptive_min_spin)
         dlmode_layout.addStretch()
-        self.parallel_spin.setEnabled(self.dlmode_combo.currentData() == "parallel")
+
+        # Adaptive mode: the limit follows throughput (core.adaptive)
+        self._adaptive = AdaptiveLimit(self.adaptive_min_spin.value(),
+                                       self.parallel_spin.value(), start=3)
+        self._adaptive_timer = QTimer(self)
+        self._adaptive_timer.setInterval(2000)
+        self._adaptive_timer.timeout.connect(self._sample_adaptive)
+        self._update_dlmode_controls()
 
         self.downloads_group.setContentLayout(dlmode_layout)
         settings_layout.addWidget(self.downloads_group)
 
+        # Bandwidth cap shared by all downloads, by time of week
+        self.bandwidth_group = self._make_section("bandwidth", self.tr("Bandwidth"))
+        bw_layout = QGridLayout()
+        bw_layout.setContentsMargins(6, 4, 6, 4)
+        bw_layout.setHorizontalSpacing(10)
+
+        def mbps_spin(key, default):
+            spin = QDoubleSpinBox()
+            spin.setRange(0, 1000)
+            spin.setDecimals(1)
+            spin.setSingleStep(0.5)
+            spin.setSpecialValueText("∞")  # 0 = unlimited
+            spin.setValue(self.settings.value(key, default, type=float))
+            spin.valueChanged.connect(self._apply_bandwidth_schedule)
+            return spin
+
+        def hour_spin(key, default):
+            spin = QSpinBox()
+            spin.setRange(0, 24)
+            spin.setSuffix(":00")
+            spin.setValue(self.settings.value(key, default, type=int))
+            spin.valueChanged.connect(self._apply_bandwidth_schedule)
+            return spin
+
+        self.bw_hours_label = QLabel(self.tr("Work hours (Mon-Fri):"))
+        bw_layout.addWidget(self.bw_hours_label, 0, 0)
+        self.bw_from_spin = hour_spin("bw_work_from", 9)
+        bw_layout.addWidget(self.bw_from_spin, 0, 1)
+        self.bw_to_spin = hour_spin("bw_work_to", 18)
+        bw_layout.addWidget(self.bw_to_spin, 0, 2)
+        self.bw_work_label = QLabel(self.tr("Limit in work hours, MB/s:"))
+        bw_layout.addWidget(self.bw_work_label, 1, 0)
+        self.bw_work_spin = mbps_spin("bw_work_limit", 0.0)
+        bw_layout.addWidget(self.bw_work_spin, 1, 1)
+        self.bw_other_label = QLabel(self.tr("Limit at other times, MB/s:"))
+        bw_layout.addWidget(self.bw_other_label, 2, 0)
+        self.bw_other_spin = mbps_spin("bw_other_limit", 0.0)
+        bw_layout.addWidget(self.bw_other_spin, 2, 1)
+        bw_layout.setColumnStretch(3, 1)
+        self._apply_bandwidth_schedule()
+
+        self.bandwidth_group.setContentLayout(bw_layout)
+        settings_layout.addWidget(self.bandwidth_group)
+
         # Cookies file (used when a Cookies combo is set to "From file")
         self.cookies_group = self._make_section("cookies", self.tr("Cookies file"))
         cookies_layout = QHBoxLayout()
@@ -717,9 +810,8 @@ class YouTubeDownloader(QMainWindow):
         self.banner.update()
         for box in self._sections:
             box.apply_theme()
-        for items in (self.video_items, self.audio_items):
-            for _, item_widget in items.values():
-                item_widget.apply_theme()
+        for model in (self.video_model, self.audio_model):
+            model.refresh()
 
     # ------------------------------------------------------- preferences
 
@@ -764,15 +856,21 @@ class YouTubeDownloader(QMainWindow):
         self.settings.setValue("download_mode",
                                self.dlmode_combo.currentData() or "parallel")
         self.settings.setValue("parallel_limit", self.parallel_spin.value())
+        self.settings.setValue("adaptive_min", self.adaptive_min_spin.value())
         self.settings.setValue("cookies_file", self.cookies_file)
 
     def closeEvent(self, event):
         """Stop active downloads and save preferences before closing"""
         self._save_preferences()
-        self._queue.clear()
+        self._jobs.clear()
+        self._prefetch_timer.stop()
+        mirror_probes = list(self._mirror_probes)
+        self._mirrors.clear()
         pending = [w for w in (*self.video_workers.values(),
                                *self.audio_workers.values(),
-                               *self._zombie_workers) if w.isRunning()]
+                               *self._zombie_workers, self._prefetch,
+                               self._probe, *mirror_probes)
+                   if w is not None and w.isRunning()]
         for worker in pending:
             try:
                 worker.stop()
@@ -877,6 +975,8 @@ class YouTubeDownloader(QMainWindow):
             self.download_audio_btn.setText("⬇ " + self.tr("Download Audio"))
             self.audio_downloads_group.setTitle(self.tr("Active Downloads"))
             self.clear_audio_completed_btn.setText("🧹 " + self.tr("Clear Completed"))
+            for model in (self.video_model, self.audio_model):
+                model.refresh()
 
             self.logs_group.setTitle(self.tr("Download Logs"))
             self.clear_logs_btn.setText("🧹 " + self.tr("Clear Logs"))
@@ -889,6 +989,12 @@ class YouTubeDownloader(QMainWindow):
             self.dlmode_label.setText(self.tr("Mode:"))
             self.dlmode_combo.setItemText(0, self.tr("Sequential (one by one)"))
             self.dlmode_combo.setItemText(1, self.tr("Parallel"))
+            self.dlmode_combo.setItemText(2, self.tr("Adaptive"))
+            self.adaptive_min_label.setText(self.tr("Minimum:"))
+            self.bandwidth_group.setTitle(self.tr("Bandwidth"))
+            self.bw_hours_label.setText(self.tr("Work hours (Mon-Fri):"))
+            self.bw_work_label.setText(self.tr("Limit in work hours, MB/s:"))
+            self.bw_other_label.setText(self.tr("Limit at other times, MB/s:"))
             self.parallel_label.setText(self.tr("Parallel downloads:"))
             self.cookies_group.setTitle(self.tr("Cookies file"))
             self.cookies_choose_btn.setText("📂 " + self.tr("Choose"))
@@ -924,6 +1030,57 @@ class YouTubeDownloader(QMainWindow):
     def clear_url(self):
         self.url_input.clear()
 
+    # -------------------------------------------------- speculative prefetch
+
+    def _on_url_changed(self, text):
+        """A new link: drop the old prefetch result, debounce a new one"""
+        if self._prefetched is not None and self._prefetched[0] != text.strip():
+            self._prefetched = None
+        self._prefetch_timer.start()
+
+    def _current_media_type(self):
+        return "Audio" if self.tabs.currentIndex() == 1 else "Video"
+
+    def _start_prefetch(self):
+        """Extract the pasted link in the background before Download is pressed"""
+        url = self.url_input.text().strip()
+        if not url.startswith(("http://", "https://")) or is_collection(url):
+            return
+        if self._prefetched is not None and self._prefetched[0] == url:
+            return
+        if not config.ytdlp_module_available():
+            return
+        if self._prefetch is not None and self._prefetch.isRunning():
+            if self._prefetch.url != url:
+                self._prefetch_pending = url
+            return
+        use_cookies, browser, cfile = self._cookie_params(self._current_media_type())
+        self._prefetch = MetadataPrefetchWorker(url, use_cookies, browser, cfile)
+        self._prefetch.done.connect(
+            lambda u, info, p=(use_cookies, browser, cfile): self._on_prefetch_done(u, p, info))
+        self._prefetch.finished.connect(self._on_prefetch_finished)
+        self._prefetch.start()
+
+    def _on_prefetch_done(self, url, cookie_params, info):
+        # Thrown away if the Link field changed meanwhile
+        if url == self.url_input.text().strip():
+            self._prefetched = (url, cookie_params, info)
+
+    def _on_prefetch_finished(self):
+        pending, self._prefetch_pending = self._prefetch_pending, None
+        if pending and pending == self.url_input.text().strip():
+            self._start_prefetch()
+
+    def _take_prefetched(self, job):
+        """Prefetched info dict for a job on the same link and cookies, or None"""
+        if self._prefetched is None:
+            return None
+        url, cookie_params, info = self._prefetched
+        if media_key(url) != job.key or cookie_params != (
+                job.use_cookies, job.browser, job.cookies_file):
+            return None
+        return copy.deepcopy(info)
+
     def select_default_directory(self):
         directory = QFileDialog.getExistingDirectory(self, self.tr("Select Default Folder"))
         if directory:
@@ -953,21 +1110,65 @@ class YouTubeDownloader(QMainWindow):
             return False, "disabled", self.cookies_file
         return data != "disabled", data, ""
 
-    def _on_dlmode_changed(self):
+    def _update_dlmode_controls(self):
         mode = self.dlmode_combo.currentData() or "parallel"
-        self.parallel_spin.setEnabled(mode == "parallel")
-        self.settings.setValue("download_mode", mode)
+        self.parallel_spin.setEnabled(mode != "sequential")
+        self.adaptive_min_label.setVisible(mode == "adaptive")
+        self.adaptive_min_spin.setVisible(mode == "adaptive")
+        if mode == "adaptive":
+            self._adaptive_timer.start()
+        else:
+            self._adaptive_timer.stop()
+
+    def _on_dlmode_changed(self):
+        self._update_dlmode_controls()
+        self.settings.setValue("download_mode",
+                               self.dlmode_combo.currentData() or "parallel")
         self._pump_queue()
 
     def _on_parallel_limit_changed(self, value):
-        self.settings.setValue("parallel_limit", value)
+        self.settings.setValue("parallel_limit", self.parallel_spin.value())
+        self.settings.setValue("adaptive_min", self.adaptive_min_spin.value())
+        self._adaptive.set_bounds(self.adaptive_min_spin.value(),
+                                  self.parallel_spin.value())
         self._pump_queue()
 
+    def _apply_bandwidth_schedule(self):
+        """Hand the Bandwidth settings to the global limiter; running
+        module-backend downloads follow at once"""
+        mb = 1024 * 1024
+        work = self.bw_work_spin.value()
+        other = self.bw_other_spin.value()
+        start, end = self.bw_from_spin.value(), self.bw_to_spin.value()
+        self.settings.setValue("bw_work_limit", work)
+        self.settings.setValue("bw_other_limit", other)
+        self.settings.setValue("bw_work_from", start)
+        self.settings.setValue("bw_work_to", end)
+        rules = [(range(5), start, end, int(work * mb))] if start != end else []
+        get_limiter().set_schedule(BandwidthSchedule(rules, int(other * mb)))
+
+    def _sample_adaptive(self):
+        """Feed the adaptive controller: aggregate and per-job speed, and
+        how many running jobs are still extracting"""
+        workers = [*self.video_workers.values(), *self.audio_workers.values()]
+        old = self._adaptive.limit
+        limit, reason = self._adaptive.update(
+            sum(w.speed for w in workers),
+            sum(1 for w in workers if w.speed > 0),
+            sum(1 for w in workers if w.downloaded_bytes <= 0),
+            len(workers), self._jobs.pending_count())
+        if reason:
+            self.log(f"Adaptive download limit {old} -> {limit} ({reason})")
+            self._pump_queue()
+
     # ---------------------------------------------------- download queue
 
     def _download_limit(self):
-        if (self.dlmode_combo.currentData() or "parallel") == "sequential":
+        mode = self.dlmode_combo.currentData() or "parallel"
+        if mode == "sequential":
             return 1
+        if mode == "adaptive":
+            return self._adaptive.limit
         return self.parallel_spin.value()
 
     def _running_count(self):
@@ -975,19 +1176,71 @@ class YouTubeDownloader(QMainWindow):
 
     def _pump_queue(self):
         """Start queued downloads while there are free slots"""
-        while self._queue and self._running_count() < self._download_limit():
-            job = self._queue.pop(0)
+        self._feed_mirrors()
+        while self._running_count() < self._download_limit():
+            job = self._jobs.pop_next()
+            if job is None:
+                break  # empty, or every waiting site is at its cap
+            self._launch_job(job)
+        self._preempt()
+
+    def _preempt(self):
+        """A more urgent job waits for a slot, or for its site's cap: pause
+        the least urgent running batch job (of that site, for a capped
+        one; it goes back to the front of its batch and resumes from its
+        .part file later) and start the urgent one"""
+        while True:
+            found = self._jobs.preemption(
+                self._running_count() < self._download_limit(), self._pausable)
+            if found is None:
+                return
+            job, victim = found
+            worker = self._workers(victim.media_type).pop(victim.dl_id, None)
+            self._jobs.requeue(victim.dl_id)
+            if worker is not None:
+                self._detach_worker(worker)
+                worker.preempt()
+                if not worker.isFinished():
+                    self._zombie_workers.add(worker)
+            self._model(victim.media_type).update(victim.dl_id, state='queued')
+            self.log(f"Paused for a more urgent download: {victim.url}")
+            self._jobs.take(job)
             self._launch_job(job)
 
+    def _detach_worker(self, worker):
+        """A preempted worker's last signals must not touch its card or
+        job, which are queued again (an error would finish the job)"""
+        for signal in (worker.finished_signal, worker.error_signal,
+                       worker.progress_signal, worker.conversion_signal):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass
+
+    def _pausable(self, job):
+        """Only transfers are interrupted, never a conversion"""
+        entry = self._model(job.media_type).entry(job.dl_id)
+        return entry is not None and entry.state == 'downloading'
+
+    def move_to_top(self, dl_id, media_type):
+        """Start a queued job next, pausing a batch job if no slot is free"""
+        if self._jobs.move_to_top(dl_id):
+            self._pump_queue()
+
+    def _new_batch(self, kind):
+        """Id of a group of jobs that takes turns with the other groups"""
+        self._batch_seq += 1
+        return f"{kind}-{self._batch_seq}"
+
     def _url_busy(self, url, media_type):
-        if any(w.url == url for w in self._workers(media_type).values()):
-            return True
-        return any(j["url"] == url and j["media_type"] == media_type
-                   for j in self._queue)
+        """Is the video behind url queued or downloading already (under
+        any form of its link)?"""
+        return self._jobs.busy(media_key(url), media_type)
 
     def _enqueue_url(self, url, media_type, overwrite=False, filename_suffix="",
-                     title=None):
-        """Create a download card and put the job into the queue"""
+                     title=None, priority=PRIORITY_HIGH, batch=None):
+        """Create a download card and put the job into the queue; jobs of
+        one batch (a picker selection, a mirror) share their turns"""
         if self._url_busy(url, media_type):
             return
 
@@ -996,75 +1249,55 @@ class YouTubeDownloader(QMainWindow):
         self._download_seq += 1
         dl_id = f"{media_type}-{self._download_seq}"
 
-        item_widget = DownloadItemWidget(
-            title or self.tr("Preparing download..."), media_type, tr=self.tr)
-        if title:
-            item_widget.title_label.setToolTip(title)
-        list_item = QListWidgetItem()
-        list_item.setSizeHint(item_widget.sizeHint())
-        downloads_list = self._downloads_list(media_type)
-        downloads_list.addItem(list_item)
-        downloads_list.setItemWidget(list_item, item_widget)
-        self._items(media_type)[dl_id] = (list_item, item_widget)
-
-        item_widget.cancel_button.clicked.connect(lambda _, d=dl_id: self.cancel_download(d, media_type))
-        item_widget.pause_button.clicked.connect(lambda _, d=dl_id: self.pause_download(d, media_type))
-        item_widget.delete_button.clicked.connect(lambda _, d=dl_id: self.remove_download(d, media_type))
-
-        job = {
-            "dl_id": dl_id,
-            "media_type": media_type,
-            "url": url,
-            "use_cookies": use_cookies,
-            "browser": browser,
-            "cookies_file": cfile,
-            "resolution": self.resolution_combo.currentText() if media_type == "Video" else "",
-            "video_format": self.video_format_combo.currentText() if media_type == "Video" else "",
-            "audio_format": self.audio_combo.currentText() if media_type == "Audio" else "",
-            "output_dir": self.output_dir,
-            "overwrite": overwrite,
-            "filename_suffix": filename_suffix,
-        }
-        self._queue.append(job)
-        item_widget.set_queued()
+        self._model(media_type).add(DownloadEntry(
+            dl_id, media_type, title or self.tr("Preparing download...")))
+
+        self._jobs.add(Job(
+            dl_id, media_type, url, media_key(url), site(url),
+            priority=priority,
+            batch=batch,
+            use_cookies=use_cookies,
+            browser=browser,
+            cookies_file=cfile,
+            resolution=self.resolution_combo.currentText() if media_type == "Video" else "",
+            video_format=self.video_format_combo.currentText() if media_type == "Video" else "",
+            audio_format=self.audio_combo.currentText() if media_type == "Audio" else "",
+            output_dir=self.output_dir,
+            overwrite=overwrite,
+            filename_suffix=filename_suffix,
+        ))
         self._pump_queue()
 
     def _launch_job(self, job):
         """Create and start the worker for a queued job"""
-        media_type = job["media_type"]
-        dl_id = job["dl_id"]
-        pair = self._items(media_type).get(dl_id)
-        if pair is None:
+        media_type = job.media_type
+        dl_id = job.dl_id
+        model = self._model(media_type)
+        if model.entry(dl_id) is None:
+            self._jobs.finish(dl_id)
             return  # the card was removed while waiting
-        _, item_widget = pair
 
         worker = DownloadWorker(
-            url=job["url"],
-            use_cookies=job["use_cookies"],
-            browser=job["browser"],
+            url=job.url,
+            use_cookies=job.use_cookies,
+            browser=job.browser,
             media_type=media_type,
-            resolution=job["resolution"],
-            video_format=job["video_format"],
-            audio_format=job["audio_format"],
-            output_dir=job["output_dir"],
-            overwrite=job["overwrite"],
-            filename_suffix=job["filename_suffix"],
-            cookies_file=job["cookies_file"],
+            resolution=job.resolution,
+            video_format=job.video_format,
+            audio_format=job.audio_format,
+            output_dir=job.output_dir,
+            overwrite=job.overwrite,
+            filename_suffix=job.filename_suffix,
+            cookies_file=job.cookies_file,
+            bandwidth_weight=BANDWIDTH_WEIGHTS.get(job.priority, 1.0),
+            info=self._take_prefetched(job),
         )
-        self.setup_worker(worker, dl_id, media_type, item_widget)
+        self.setup_worker(worker, dl_id, media_type)
         self._workers(media_type)[dl_id] = worker
-        item_widget.set_started()
+        model.update(dl_id, state='downloading')
 
     # ------------------------------------------------------ start download
 
-    def _looks_like_collection(self, url):
-        """Channel or playlist URL (multiple videos)?"""
-        u = url.lower()
-        if "watch?v=" in u or "/shorts/" in u:
-            return False
-        return any(p in u for p in ("playlist?list=", "/playlist/", "/channel/",
-                                    "/c/", "/user/", "/@"))
-
     def start_download(self, media_type):
         url = self.url_input.text().strip()
         if not url:
@@ -1080,7 +1313,7 @@ class YouTubeDownloader(QMainWindow):
             return
 
         # Channel / playlist: show the video picker
-        if self._looks_like_collection(url):
+        if is_collection(url):
             self._probe_collection(url, media_type)
             return
 
@@ -1092,7 +1325,8 @@ class YouTubeDownloader(QMainWindow):
         # Was this link already downloaded before? Ask what to do.
         overwrite = False
         filename_suffix = ""
-        entry = self._history.get(f"{media_type}|{url}")
+        key = canonical(url)
+        entry = self._history.get(media_type, url, media_id(*key) if key else None)
         if isinstance(entry, dict):
             old_file = entry.get("file") or ""
             if old_file and os.path.exists(old_file):
@@ -1109,15 +1343,27 @@ class YouTubeDownloader(QMainWindow):
     # ------------------------------------------------- channel / playlist
 
     def _probe_collection(self, url, media_type):
-        """Fetch the list of videos behind a channel/playlist link"""
+        """Stream the list of videos behind a channel/playlist link; the
+        picker opens on the first page and keeps filling"""
         if self._probe is not None and self._probe.isRunning():
             return
         use_cookies, browser, cfile = self._cookie_params(media_type)
         self._probe_media = media_type
-        self._probe = PlaylistProbeWorker(url, use_cookies, browser, cfile)
+        self._probe_picker = None
+        cached = get_listing_cache().get(url)
+        self._probe = PlaylistProbeWorker(url, use_cookies, browser, cfile,
+                                          cached=cached)
+        self._probe.page.connect(self._on_probe_page)
+        self._probe.delta.connect(self._on_probe_delta)
         self._probe.done.connect(self._on_probe_done)
         self._probe.failed.connect(self._on_probe_failed)
 
+        if cached is not None:
+            # stale-while-revalidate: the cached listing opens at once
+            self._probe.start()
+            self._open_probe_picker(cached[0])
+            return
+
         self._probe_dialog = QProgressDialog(
             self.tr("Fetching video list..."), self.tr("Cancel"), 0, 0, self)
         self._probe_dialog.setWindowTitle(self.tr("Select videos to download"))
@@ -1127,14 +1373,21 @@ class YouTubeDownloader(QMainWindow):
         self._probe.start()
         self._probe_dialog.show()
 
-    def _cancel_probe(self):
+    def _disconnect_probe(self):
         if self._probe is not None:
             try:
+                self._probe.page.disconnect(self._on_probe_page)
+                self._probe.delta.disconnect(self._on_probe_delta)
                 self._probe.done.disconnect(self._on_probe_done)
                 self._probe.failed.disconnect(self._on_probe_failed)
             except Exception:
                 pass
 
+    def _cancel_probe(self):
+        if self._probe is not None:
+            self._disconnect_probe()
+            self._probe.stop()
+
     def _close_probe_dialog(self):
         if self._probe_dialog is not None:
             try:
@@ -1144,22 +1397,148 @@ class YouTubeDownloader(QMainWindow):
             self._probe_dialog.reset()
             self._probe_dialog = None
 
-    def _on_probe_done(self, items):
+    def _on_probe_page(self, items):
+        if self._probe_picker is not None:
+            self._probe_picker.add_items(items)
+            return
+        # first page: open the picker; later pages arrive while it runs
         self._close_probe_dialog()
+        self._open_probe_picker(items)
+
+    def _on_probe_delta(self, items):
+        if self._probe_picker is not None:
+            self._probe_picker.insert_new_items(items)
+
+    def _open_probe_picker(self, items):
         from ui.dialogs import VideoSelectDialog
-        dlg = VideoSelectDialog(items, parent=self, tr=self.tr)
-        if dlg.exec_():
+        probe = self._probe
+        dlg = VideoSelectDialog(items, parent=self, tr=self.tr, complete=False)
+        dlg.more_requested.connect(probe.request_more)
+        self._probe_picker = dlg
+        accepted = dlg.exec_()
+        self._probe_picker = None
+        if accepted and dlg.mirror:
+            # the probe keeps listing, now for the mirror: it no longer
+            # blocks the next channel/playlist link
+            self._disconnect_probe()
+            self._probe = None
+            self._start_mirror(probe, dlg.items, self._probe_media,
+                               dlg.is_complete())
+            return
+        self._cancel_probe()
+        if accepted:
             selected = dlg.selected_items()
+            batch = self._new_batch("list")
             for it in selected:
-                self._enqueue_url(it["url"], self._probe_media, title=it["title"])
+                self._enqueue_url(it["url"], self._probe_media, title=it["title"],
+                                  priority=PRIORITY_NORMAL, batch=batch)
             if selected:
                 self.log(f"Queued {len(selected)} video(s) from the list")
 
+    def _on_probe_done(self):
+        if self._probe_picker is not None:
+            self._probe_picker.set_complete()
+
     def _on_probe_failed(self, msg):
+        if self._probe_picker is not None:
+            # later page failed: keep what is listed already
+            self._probe_picker.set_complete()
+            self.log(f"Video list incomplete: {msg}")
+            return
         self._close_probe_dialog()
         QMessageBox.warning(self, self.tr("Error"),
                             self.tr("Failed to get video list") + f"\n{msg}")
 
+    # ------------------------------------------------------ channel mirror
+
+    def _start_mirror(self, probe, items, media_type, listed_all):
+        """Download every video of the listing that is not in the output
+        folder's archive. Archived IDs are skipped by a set lookup, without
+        extraction; the rest is fed into the queue a little ahead of the
+        free download slots, and the probe lists further pages only as the
+        backlog drains."""
+        mirror = {
+            "probe": probe,
+            "media_type": media_type,
+            "archive": get_archive(self.output_dir, media_type),
+            "batch": self._new_batch("mirror"),
+            "pending": collections.deque(),
+            "seen": set(),
+            "listed_all": listed_all or not probe.isRunning(),
+            "more_pending": False,
+            "listed": 0,
+            "skipped": 0,
+            "queued": 0,
+        }
+        probe.page.connect(lambda items, m=mirror: self._mirror_add(m, items, True))
+        probe.delta.connect(lambda items, m=mirror: self._mirror_add(m, items))
+        probe.done.connect(lambda m=mirror: self._mirror_listed(m))
+        probe.failed.connect(lambda msg, m=mirror: self._mirror_listed(m, msg))
+        self._mirrors.append(mirror)
+        self._mirror_probes.add(probe)
+        probe.finished.connect(lambda p=probe: self._mirror_probes.discard(p))
+        self.log(f"Mirroring {probe.url} into {self.output_dir}")
+        self._mirror_add(mirror, items)
+
+    def _mirror_add(self, mirror, items, requested=False):
+        if mirror not in self._mirrors:
+            return
+        archive = mirror["archive"]
+        for it in items:
+            key = it.get("id") or it.get("url")
+            if key in mirror["seen"]:
+                continue
+            mirror["seen"].add(key)
+            mirror["listed"] += 1
+            if archive.contains(it.get("extractor"), it.get("id")):
+                mirror["skipped"] += 1
+            else:
+                mirror["pending"].append(it)
+        if requested:
+            mirror["more_pending"] = False
+        self._pump_queue()
+
+    def _mirror_listed(self, mirror, error=None):
+        if mirror not in self._mirrors:
+            return
+        mirror["listed_all"] = True
+        if error:
+            self.log(f"Video list incomplete: {error}")
+        self._pump_queue()
+
+    def _feed_mirrors(self):
+        """Top the queue up from the running mirrors: about two jobs per
+        download slot wait, the rest stays a list of picker items"""
+        if self._feeding or not self._mirrors:
+            return
+        self._feeding = True
+        try:
+            target = 2 * self._download_limit()
+            for mirror in list(self._mirrors):
+                pending = mirror["pending"]
+                media_type = mirror["media_type"]
+                while pending and self._jobs.pending_count() < target:
+                    it = pending.popleft()
+                    if self._url_busy(it["url"], media_type):
+                        continue
+                    self._enqueue_url(it["url"], media_type, title=it["title"],
+                                      priority=PRIORITY_NORMAL,
+                                      batch=mirror["batch"])
+                    mirror["queued"] += 1
+                probe = mirror["probe"]
+                if mirror["listed_all"]:
+                    if not pending:
+                        self._mirrors.remove(mirror)
+                        self.log(f"Mirror listed {mirror['listed']} video(s): "
+                                 f"{mirror['skipped']} already downloaded, "
+                                 f"{mirror['queued']} queued")
+                elif (len(pending) < probe.PAGE_SIZE
+                        and not mirror["more_pending"]):
+                    mirror["more_pending"] = True
+                    probe.request_more()
+        finally:
+            self._feeding = False
+
     # --------------------------------------------------------- duplicates
 
     def _ask_duplicate_action(self, old_file):
@@ -1183,40 +1562,41 @@ class YouTubeDownloader(QMainWindow):
             return "copy"
         return "cancel"
 
-    def _record_download(self, media_type, url, filename, suffix):
-        """Remember a finished download for future duplicate detection"""
-        key = f"{media_type}|{url}"
-        old = self._history.get(key)
-        entry = old if isinstance(old, dict) else {}
-        if suffix:
-            digits = ''.join(ch for ch in suffix if ch.isdigit())
-            count = int(digits) if digits else int(entry.get("count", 1)) + 1
-        else:
-            count = max(int(entry.get("count", 0) or 0), 1)
-        self._history[key] = {"file": filename, "count": count}
-        if len(self._history) > 300:
-            for k in list(self._history)[:len(self._history) - 300]:
-                del self._history[k]
+    def _migrate_history(self):
+        """Move the pre-SQLite history (a JSON blob in QSettings) into the
+        history database, once"""
+        if not self.settings.contains("download_history"):
+            return
         try:
-            self.settings.setValue("download_history",
-                                   json.dumps(self._history, ensure_ascii=False))
+            entries = json.loads(self.settings.value("download_history", "{}"))
         except Exception:
-            pass
+            entries = {}
+        if not isinstance(entries, dict):
+            entries = {}
+        if entries and self._history.import_legacy(entries) is None:
+            return  # database unavailable: try again next start
+        self.settings.remove("download_history")
+
+    def _record_download(self, media_type, url, filename, suffix, key=None):
+        """Remember a finished download for future duplicate detection;
+        key is the (extractor, id) of the video when known"""
+        key = key or canonical(url)
+        self._history.record(media_type, url, filename, suffix,
+                             media_id(*key) if key else None)
 
     # -------------------------------------------------------- worker glue
 
-    def _set_item_title(self, item_widget, title):
-        item_widget.title_label.setText(title)
-        item_widget.title_label.setToolTip(title)
-
-    def setup_worker(self, worker, dl_id, media_type, item_widget):
-        worker.title_signal.connect(lambda title: self._set_item_title(item_widget, title))
-        worker.thumbnail_signal.connect(item_widget.set_thumbnail)
-        worker.progress_signal.connect(item_widget.update_progress)
-        worker.finished_signal.connect(lambda filename: self.download_completed(dl_id, media_type, item_widget, filename))
-        worker.error_signal.connect(lambda msg: self.show_error(msg, dl_id, media_type, item_widget))
+    def setup_worker(self, worker, dl_id, media_type):
+        model = self._model(media_type)
+        worker.title_signal.connect(lambda title: model.update(dl_id, title=title))
+        worker.thumbnail_signal.connect(
+            lambda url, data: model.set_thumbnail(dl_id, url, data))
+        worker.progress_signal.connect(
+            lambda *progress: model.set_progress(dl_id, *progress))
+        worker.finished_signal.connect(lambda filename: self.download_completed(dl_id, media_type, filename))
+        worker.error_signal.connect(lambda msg: self.show_error(msg, dl_id, media_type))
         worker.log_signal.connect(self.log)
-        worker.conversion_signal.connect(lambda status: self.handle_conversion(status, item_widget))
+        worker.conversion_signal.connect(lambda status: self.handle_conversion(status, dl_id, media_type))
         # Drop the reference kept in _zombie_workers once the thread really ends
         worker.finished.connect(lambda w=worker: self._zombie_workers.discard(w))
         worker.start()
@@ -1224,29 +1604,27 @@ class YouTubeDownloader(QMainWindow):
     def _retire_worker(self, dl_id, media_type):
         """Remove worker from the active dict, keeping it alive until its thread ends"""
         worker = self._workers(media_type).pop(dl_id, None)
+        self._jobs.finish(dl_id)
         if worker is not None and not worker.isFinished():
             self._zombie_workers.add(worker)
 
-    def handle_conversion(self, status, item_widget):
+    def handle_conversion(self, status, dl_id, media_type):
         if status == 'started':
-            item_widget.set_converting()
+            self._model(media_type).update(dl_id, state='converting')
         elif status == 'finished':
-            item_widget.set_completed()
+            self._model(media_type).update(dl_id, state='completed')
 
-    def download_completed(self, dl_id, media_type, item_widget, filename):
+    def download_completed(self, dl_id, media_type, filename):
         self.log(f"{media_type} downloaded: {filename}")
 
         worker = self._workers(media_type).get(dl_id)
         if worker is not None and filename:
             self._record_download(media_type, worker.url, filename,
-                                  worker.filename_suffix)
+                                  worker.filename_suffix, worker.media_key)
+        if worker is not None and worker.media_key:
+            get_archive(worker.output_dir, media_type).add(*worker.media_key)
 
-        item_widget.set_completed()
-        item_widget.cancel_button.setVisible(False)
-        item_widget.pause_button.setVisible(False)
-        item_widget.delete_button.setVisible(True)
-        item_widget.title_label.setStyleSheet(
-            f"color: {config.COLOR_GREEN}; font-weight: 600; background: transparent;")
+        self._model(media_type).update(dl_id, state='completed')
 
         self._retire_worker(dl_id, media_type)
         self._pump_queue()
@@ -1311,35 +1689,21 @@ class YouTubeDownloader(QMainWindow):
         if worker is None:
             return
         worker.pause()
-        items = self._items(media_type)
-        if dl_id in items:
-            _, item_widget = items[dl_id]
-            item_widget.set_paused(worker.paused)
+        self._model(media_type).update(
+            dl_id, state='paused' if worker.paused else 'downloading')
 
     def cancel_download(self, dl_id, media_type):
         worker = self._workers(media_type).get(dl_id)
 
         if worker is None:
             # still waiting in the queue?
-            for i, job in enumerate(self._queue):
-                if job["dl_id"] == dl_id and job["media_type"] == media_type:
-                    del self._queue[i]
-                    break
-            else:
+            if self._jobs.finish(dl_id) is None:
                 return
         else:
             worker.stop()
             worker.wait(5000)  # bounded so a stalled worker cannot freeze the UI
 
-        items = self._items(media_type)
-        if dl_id in items:
-            _, item_widget = items[dl_id]
-            item_widget.set_canceled()
-            item_widget.cancel_button.setVisible(False)
-            item_widget.pause_button.setVisible(False)
-            item_widget.delete_button.setVisible(True)
-            item_widget.title_label.setStyleSheet(
-                f"color: {config.COLOR_RED}; font-weight: 600; background: transparent;")
+        self._model(media_type).update(dl_id, state='canceled')
 
         if worker is not None:
             self._retire_worker(dl_id, media_type)
@@ -1347,20 +1711,10 @@ class YouTubeDownloader(QMainWindow):
         self._pump_queue()
 
     def remove_download(self, dl_id, media_type):
-        items = self._items(media_type)
-        if dl_id in items:
-            list_item, _ = items[dl_id]
-            downloads_list = self._downloads_list(media_type)
-            downloads_list.takeItem(downloads_list.row(list_item))
-            del items[dl_id]
+        self._model(media_type).remove(dl_id)
 
     def _clear_completed(self, media_type):
-        items = self._items(media_type)
-        downloads_list = self._downloads_list(media_type)
-        for dl_id in [d for d, (_, w) in items.items() if w.delete_button.isVisible()]:
-            list_item, _ = items[dl_id]
-            downloads_list.takeItem(downloads_list.row(list_item))
-            del items[dl_id]
+        self._model(media_type).remove_finished()
 
     def clear_completed_video(self):
         self._clear_completed("Video")
@@ -1368,16 +1722,14 @@ class YouTubeDownloader(QMainWindow):
     def clear_completed_audio(self):
         self._clear_completed("Audio")
 
-    def show_error(self, message, dl_id, media_type, item_widget):
+    def show_error(self, message, dl_id, media_type):
         QMessageBox.critical(self, self.tr("Error"), message)
         self.log(f"Error downloading {media_type}: {message}")
+        if ("429" in message or "Too Many Requests" in message
+                or BOT_CHECK_MARKER in message or "bot verification" in message):
+            self._adaptive.congestion()  # the site pushes back: fewer jobs
 
-        item_widget.set_error()
-        item_widget.cancel_button.setVisible(False)
-        item_widget.pause_button.setVisible(False)
-        item_widget.delete_button.setVisible(True)
-        item_widget.title_label.setStyleSheet(
-            f"color: {config.COLOR_RED}; font-weight: 600; background: transparent;")
+        self._model(media_type).update(dl_id, state='error')
 
         self._retire_worker(dl_id, media_type)
         self._pump_queue()